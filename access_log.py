@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Structured access log for the Flask servers
+Each request is queued as one record (method, path, status, response size, duration) and
+a background thread writes them out as JSON lines in batches, so requests never wait on
+stdout.
+High-volume paths (display polls, images) can be sampled.
+
+ACCESS_LOG=off disables it; ACCESS_LOG_SAMPLE="/path=rate,..." overrides sample rates
+(a path ending in * covers everything under that prefix).
+"""
+
+import atexit
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# Fraction of requests logged per path (others: all); errors are always logged.
+# Keys ending in * match by prefix; an exact path wins over a prefix.
+DEFAULT_SAMPLE_RATES = {
+    '/': 0.1,
+    '/seminarier': 0.1,
+    '/seminarier.csv': 0.1,
+    '/seminarier.json': 0.1,
+    '/seminarier.ics': 0.1,
+    '/d/*': 0.1,
+    '/assets/*': 0.1,
+    '/events': 0.1,
+    '/iml_background.png': 0.1,
+    '/iml_logo.png': 0.1,
+}
+
+# Records waiting to be written; beyond this they are dropped (and counted)
+MAX_QUEUED_RECORDS = 10000
+# Seconds between writer batches
+WRITE_INTERVAL = 0.5
+
+
+def parse_sample_rates(value):
+    """Parse "/path=rate,/other=rate" into {path: rate} (malformed entries are ignored)"""
+    rates = {}
+    for item in (value or '').split(','):
+        path, _, rate = item.strip().partition('=')
+        try:
+            rates[path] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+
+class AccessLog:
+    """Queue-backed JSON access log for a Flask app (see init_app)
+    It wraps the WSGI app, so the request thread only reads the WSGI environ, takes two
+    timestamps and appends a tuple to a deque (no locks, no wakeups); the writer thread
+    formats and writes whatever accumulated every WRITE_INTERVAL. Sampled records carry
+    their sample_rate.
+    """
+
+    def __init__(self, stream=None, sample_rates=None, enabled=None):
+        self.stream = stream if stream is not None else sys.stdout
+        if sample_rates is None:
+            sample_rates = dict(DEFAULT_SAMPLE_RATES)
+            sample_rates.update(parse_sample_rates(os.environ.get('ACCESS_LOG_SAMPLE')))
+        self.sample_rates = sample_rates
+        # Longest prefix first, so /d/x/* would win over /d/*
+        self.prefix_rates = sorted(((path[:-1], rate) for path, rate in sample_rates.items()
+                                    if path.endswith('*')), key=lambda item: -len(item[0]))
+        if enabled is None:
+            enabled = os.environ.get('ACCESS_LOG', 'on').lower() not in ('off', '0', 'false')
+        self.enabled = enabled
+        self.queue = deque()
+        self.dropped = 0
+        self.writer = None
+        self.writer_lock = threading.Lock()
+        atexit.register(self.drain)
+
+    def init_app(self, app):
+        """Log every request app handles"""
+        if self.enabled:
+            app.wsgi_app = self.wrap(app.wsgi_app)
+
+    def wrap(self, wsgi_app):
+        """WSGI middleware that records each response as it is started"""
+        def logged_app(environ, start_response):
+            started = time.perf_counter()
+            response = []
+
+            def capture(status, headers, exc_info=None):
+                response[:] = (status, headers)
+                return start_response(status, headers, exc_info)
+
+            result = wsgi_app(environ, capture)
+            if response:
+                self.record(environ, response[0], response[1], time.perf_counter() - started)
+            return result
+
+        return logged_app
+
+    def record(self, environ, status, headers, duration):
+        """Queue one request unless sampling skips it (error responses are always kept)"""
+        path = environ.get('PATH_INFO', '')
+        rate = self.sample_rate(path)
+        if rate < 1.0:
+            if status[0] in '45':
+                rate = 1.0
+            elif random.random() >= rate:
+                return
+        self.enqueue((time.time(), environ.get('REQUEST_METHOD'), path, status, headers, duration, rate))
+
+    def sample_rate(self, path):
+        """Fraction of requests to path that are logged"""
+        if path in self.sample_rates:
+            return self.sample_rates[path]
+        for prefix, rate in self.prefix_rates:
+            if path.startswith(prefix):
+                return rate
+        return 1.0
+
+    def enqueue(self, record):
+        """Queue a record without blocking (dropped when the writer has fallen behind)"""
+        if self.writer is None:
+            self.start_writer()
+        if len(self.queue) < MAX_QUEUED_RECORDS:
+            self.queue.append(record)
+        else:
+            self.dropped += 1
+
+    def start_writer(self):
+        with self.writer_lock:
+            if self.writer is None or not self.writer.is_alive():
+                self.writer = threading.Thread(target=self.write_forever, name='access-log', daemon=True)
+                self.writer.start()
+
+    def format(self, record):
+        """One JSON line for a queued record"""
+        timestamp, method, path, status, headers, duration, rate = record
+        size = next((value for name, value in headers if name.lower() == 'content-length'), None)
+        entry = {
+            'ts': datetime.fromtimestamp(timestamp).isoformat(timespec='milliseconds'),
+            'method': method,
+            'path': path,
+            'status': int(status[:3]),
+            'bytes': int(size) if size is not None else None,
+            'duration_ms': round(duration * 1000, 2),
+        }
+        if rate < 1.0:
+            entry['sample_rate'] = rate
+        return json.dumps(entry)
+
+    def write_forever(self):
+        while True:
+            time.sleep(WRITE_INTERVAL)
+            self.write_batch()
+
+    def write_batch(self):
+        """Write everything queued so far with a single write and flush"""
+        lines = []
+        while True:
+            try:
+                lines.append(self.format(self.queue.popleft()))
+            except IndexError:
+                break
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            lines.append(json.dumps({'ts': datetime.now().isoformat(timespec='milliseconds'),
+                                     'dropped': dropped}))
+        if not lines:
+            return
+        try:
+            self.stream.write('\n'.join(lines) + '\n')
+            self.stream.flush()
+        except (OSError, ValueError):
+            pass
+
+    def drain(self):
+        """Write out queued records (at exit)"""
+        self.write_batch()
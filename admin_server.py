@@ -8,15 +8,20 @@ Handles Excel file uploads, converts to CSV, and deploys to Railway
 from flask import Flask, render_template_string, request, jsonify
 from flask_cors import CORS
 import pandas as pd
-import os
-import subprocess
 from datetime import datetime, timedelta
 from pathlib import Path
 import sys
 
+from access_log import AccessLog
+from deploy_queue import DeployQueue
+
 app = Flask(__name__)
 CORS(app)
 
+# JSON access log written off the request thread
+access_log = AccessLog()
+access_log.init_app(app)
+
 # Configuration
 UPLOAD_FOLDER = Path(__file__).parent
 ALLOWED_EXTENSIONS = {'xlsx', 'xls'}
@@ -25,6 +30,13 @@ MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
 
+# Deploys run in the background: the updated CSV is committed, then pushed with the
+# deploy command (railway up, or DEPLOY_COMMAND); bursts of uploads share one deploy
+deploy_queue = DeployQueue(UPLOAD_FOLDER, steps=[
+    ['git', 'add', 'seminarier.csv'],
+    ['git', 'commit', '-m', 'Admin: Update seminarier.csv via web upload'],
+])
+
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -163,55 +175,6 @@ def process_excel_to_csv(excel_file):
         return False, f"Error processing file: {str(e)}", 0
 
 
-def deploy_to_railway():
-    """Deploy updated CSV to Railway"""
-    try:
-        os.chdir(UPLOAD_FOLDER)
-
-        # Add CSV to git
-        subprocess.run(['git', 'add', 'seminarier.csv'],
-                      capture_output=True, check=False)
-
-        # Commit
-        subprocess.run(['git', 'commit', '-m', 'Admin: Update seminarier.csv via web upload'],
-                      capture_output=True, check=False)
-
-        # Try different paths for railway CLI
-        railway_paths = [
-            'railway',  # Try standard PATH first
-            'railway.cmd',  # Windows command wrapper
-            os.path.expanduser('~/.npm-global/railway'),  # npm global
-            os.path.expanduser('~/.npm-global/railway.cmd'),  # npm global (Windows)
-            'C:\\Users\\chrwah28.KVA\\.npm-global\\railway',  # Specific user path
-            'C:\\Users\\chrwah28.KVA\\.npm-global\\railway.cmd',  # Specific user path (Windows)
-        ]
-
-        result = None
-        for railway_path in railway_paths:
-            try:
-                result = subprocess.run([railway_path, 'up'],
-                                      capture_output=True,
-                                      text=True,
-                                      timeout=120)
-                if result.returncode == 0 or result.returncode != 127:
-                    break
-            except (FileNotFoundError, subprocess.TimeoutExpired):
-                continue
-
-        if result is None:
-            return False, "Railway CLI not found. Make sure it's installed with: npm install -g @railway/cli"
-
-        if result.returncode == 0:
-            return True, "Deployed to Railway successfully"
-        else:
-            return False, f"Railway deployment failed: {result.stderr}"
-
-    except subprocess.TimeoutExpired:
-        return False, "Railway deployment timed out (taking longer than expected)"
-    except Exception as e:
-        return False, f"Deployment error: {str(e)}"
-
-
 @app.route('/')
 def index():
     """Serve admin page"""
@@ -245,21 +208,15 @@ def upload_file():
         # CSV generated successfully - this is the critical part
         success_message = f'CSV updated with {count} seminars successfully!'
 
-        # Try to deploy to Railway (bonus feature, not critical)
-        deploy_success, deploy_message = deploy_to_railway()
-
-        if deploy_success:
-            return jsonify({
-                'success': True,
-                'message': success_message + ' Deployed to production. Display will update within 1-2 minutes.'
-            }), 200
-        else:
-            # CSV is generated and saved - that's what matters
-            # Deployment is secondary and will happen via automation anyway
-            return jsonify({
-                'success': True,
-                'message': success_message + ' Display will update via automatic deployment (within 1 hour). Or click "Deploy Now" button for immediate update.'
-            }), 200
+        # Queue a deploy to Railway (bonus feature, not critical; see /api/deploy/status)
+        deploy = deploy_queue.request()
+
+        return jsonify({
+            'success': True,
+            'message': success_message + ' Deployment queued. Display will update within a few minutes.',
+            'deploy': deploy,
+            'deploy_status_url': '/api/deploy/status'
+        }), 200
 
     except Exception as e:
         return jsonify({'error': f'Server error: {str(e)}'}), 500
@@ -267,37 +224,32 @@ def upload_file():
 
 @app.route('/api/deploy', methods=['POST'])
 def deploy_now():
-    """Manual deployment endpoint"""
+    """Manual deployment endpoint - queues a deploy (shared with any other pending requests)"""
     try:
-        deploy_success, deploy_message = deploy_to_railway()
-
-        if deploy_success:
-            return jsonify({
-                'success': True,
-                'message': 'Deployed successfully! Display will update within 1-2 minutes.'
-            }), 200
-        else:
-            return jsonify({
-                'success': False,
-                'message': f'Deployment in progress. {deploy_message}'
-            }), 200  # Return 200 because process started, even if not confirmed
+        deploy = deploy_queue.request()
+        return jsonify({
+            'success': True,
+            'message': 'Deployment queued. Display will update within a few minutes.',
+            'deploy': deploy,
+            'deploy_status_url': '/api/deploy/status'
+        }), 202
 
     except Exception as e:
         return jsonify({'error': f'Deployment error: {str(e)}'}), 500
 
 
+@app.route('/api/deploy/status', methods=['GET'])
+def deploy_status():
+    """State of the deploy queue and the result of the last deploy"""
+    return jsonify(deploy_queue.status()), 200
+
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
     return jsonify({'status': 'ok', 'service': 'SmartSign Admin Server'}), 200
 
 
-@app.before_request
-def log_request():
-    """Log incoming requests"""
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] {request.method} {request.path}")
-
-
 if __name__ == '__main__':
     print("=" * 80)
     print("SMARTSIGN ADMIN SERVER")
@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for the seminar pipeline and the display endpoints
+Times ingestion, filtering, speaker extraction, CSV rendering, a full upload into the
+event store and the /api/sync, /seminarier.csv and / (display page) endpoints (through
+the Flask test client) on synthetic exports from generate_export.py, and writes the
+timings as JSON so runs can be compared. Worker startup (importing server.py in a fresh
+interpreter, with and without the pipeline) is measured too: import time and RSS.
+
+Usage: python benchmark.py [--rows 1000,10000,100000] [--repeat 3] [-o results.json] [--compare old.json]
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+import pipeline
+from generate_export import generate_export, write_export
+from speakers import extract_speakers
+
+BASE_DIR = Path(__file__).parent
+RESULTS_DIR = BASE_DIR / 'benchmark_results'
+DEFAULT_ROWS = [1000, 10000, 100000]
+# GET /seminarier.csv requests timed per repeat
+DEFAULT_REQUESTS = 200
+# Modules whose presence after startup the report records
+HEAVY_MODULES = ['pandas', 'openpyxl', 'apscheduler', 'pytz', 'PIL']
+
+# Run in a fresh interpreter: import server.py as a gunicorn worker would (plus the
+# pipeline, as after an upload, when argv[1] is 'processing') and report the time taken
+# and the resident memory
+STARTUP_SCRIPT = """
+import json, resource, sys, time
+started = time.perf_counter()
+import server
+if sys.argv[1] == 'processing':
+    import pipeline
+seconds = time.perf_counter() - started
+# Resident set from /proc where there is one (ru_maxrss would include the parent's
+# peak, which survives exec on Linux)
+try:
+    with open('/proc/self/status') as status:
+        rss_mb = next(int(line.split()[1]) for line in status if line.startswith('VmRSS:')) / 1024
+except OSError:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_mb = peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+print(json.dumps({
+    'seconds': seconds,
+    'rss_mb': rss_mb,
+    'modules': [name for name in json.loads(sys.argv[2]) if name in sys.modules],
+}))
+"""
+
+
+def summarize(samples):
+    """min/median/p95 of a list of durations in seconds"""
+    ordered = sorted(samples)
+    return {
+        'min': ordered[0],
+        'median': statistics.median(ordered),
+        'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        'count': len(ordered),
+    }
+
+
+def measure(fn, repeat):
+    """Run fn repeat times; returns (last result, timing summary)"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return result, summarize(samples)
+
+
+def git_commit():
+    """Short commit hash of the checkout (None outside git)"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure_startup(storage, repeat):
+    """Import time and RSS of a fresh worker, serving only and after a pipeline import
+    Each sample is a new interpreter with STORAGE_PATH at storage; one unrecorded start
+    first fills the asset cache. Returns {mode: {'import', 'rss_mb', 'modules'}}.
+    """
+    if platform.system() == 'Windows':  # no resource module
+        return None
+    env = dict(os.environ, STORAGE_PATH=str(storage))
+
+    def start(mode):
+        output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT, mode, json.dumps(HEAVY_MODULES)],
+                                cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+    start('serving')
+    startup = {}
+    for mode in ('serving', 'processing'):
+        samples = [start(mode) for _ in range(repeat)]
+        startup[mode] = {
+            'import': summarize([sample['seconds'] for sample in samples]),
+            'rss_mb': statistics.median(sample['rss_mb'] for sample in samples),
+            'modules': samples[-1]['modules'],
+        }
+    return startup
+
+
+def print_startup(startup, baseline=None):
+    """Print worker startup cost, with the change against a baseline run when given"""
+    previous = (baseline or {}).get('startup') or {}
+    print("\nWorker startup")
+    for mode, entry in startup.items():
+        line = (f"  {mode:20} {entry['import']['median'] * 1000:10.2f} ms  {entry['rss_mb']:7.1f} MB"
+                f"  [{', '.join(entry['modules']) or 'no heavy modules'}]")
+        old = previous.get(mode)
+        if old:
+            line += f"   (was {old['import']['median'] * 1000:.2f} ms, {old['rss_mb']:.1f} MB)"
+        print(line)
+
+
+def reset_pipeline_caches(server):
+    """Empty the event store so the next upload starts cold (every row normalized again)"""
+    server.event_store.ingest([], server.normalize_rows, replace=True)
+
+
+def benchmark_size(server, rows, workdir, args):
+    """Generate (or reuse) an export of the given size and time every stage on it"""
+    export_path = workdir / f'export_{rows}_{args.seed}.xlsx'
+    generate_seconds = None
+    if not export_path.exists():
+        started = time.perf_counter()
+        write_export(generate_export(rows, seed=args.seed), export_path)
+        generate_seconds = time.perf_counter() - started
+
+    timings = {}
+    df, timings['ingest'] = measure(lambda: pipeline.ingest_workbook(export_path), args.repeat)
+    filtered_rows, timings['filter'] = measure(lambda: pipeline.filter_seminars(df), args.repeat)
+
+    descriptions = df['Description'] if 'Description' in df.columns else pd.Series([], dtype=object)
+    _, timings['speakers'] = measure(lambda: extract_speakers(descriptions), args.repeat)
+    _, timings['speakers_per_cell'] = measure(
+        lambda: descriptions.map(pipeline.extract_speaker_from_description), args.repeat)
+
+    if filtered_rows:
+        _, timings['csv'] = measure(lambda: server.render_csv(filtered_rows), args.repeat)
+
+    # Upload processing and endpoints, with the export installed as the stored workbook
+    shutil.copyfile(export_path, server.EXCEL_STORAGE)
+    timings.update(benchmark_endpoints(server, args))
+
+    return {
+        'rows': rows,
+        'rows_ingested': len(df),
+        'seminars': len(filtered_rows),
+        'generate_seconds': generate_seconds,
+        'peak_memory_mb': pipeline.peak_memory_mb(),
+        'timings': timings,
+    }
+
+
+def benchmark_endpoints(server, args):
+    """Time an upload into an empty event store, /api/sync, GET /seminarier.csv and the display page"""
+    timings = {}
+    client = server.app.test_client()
+
+    def upload_cold():
+        reset_pipeline_caches(server)
+        return server.process_excel_to_csv(server.EXCEL_STORAGE, replace=True)
+
+    _, timings['upload'] = measure(upload_cold, args.repeat)
+    response, timings['api_sync'] = measure(lambda: client.post('/api/sync'), args.repeat)
+    if response.status_code != 200:
+        print(f"/api/sync returned {response.status_code}: {response.get_json()}", file=sys.stderr)
+
+    csv_samples = []
+    not_modified_samples = []
+    etag = None
+    for _ in range(args.repeat):
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            response = client.get('/seminarier.csv')
+            csv_samples.append(time.perf_counter() - started)
+            etag = response.headers.get('ETag')
+        for _ in range(args.requests if etag else 0):
+            started = time.perf_counter()
+            client.get('/seminarier.csv', headers={'If-None-Match': etag})
+            not_modified_samples.append(time.perf_counter() - started)
+    timings['seminarier_csv'] = summarize(csv_samples)
+
+    page_samples = []
+    for _ in range(args.repeat * args.requests):
+        started = time.perf_counter()
+        client.get('/')
+        page_samples.append(time.perf_counter() - started)
+    timings['display_page'] = summarize(page_samples)
+    if not_modified_samples:
+        timings['seminarier_csv_304'] = summarize(not_modified_samples)
+
+    return timings
+
+
+def print_results(results, baseline=None):
+    """Print median timings, with the change against a baseline run when given"""
+    previous = {}
+    if baseline is not None:
+        previous = {str(entry['rows']): entry['timings'] for entry in baseline.get('results', [])}
+
+    for entry in results:
+        print(f"\n{entry['rows']} rows ({entry['rows_ingested']} ingested, {entry['seminars']} seminars)")
+        for stage, timing in entry['timings'].items():
+            line = f"  {stage:20} {timing['median'] * 1000:10.2f} ms"
+            old = previous.get(str(entry['rows']), {}).get(stage)
+            if old and old['median'] > 0:
+                line += f"   (was {old['median'] * 1000:.2f} ms, x{timing['median'] / old['median']:.2f})"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the SmartSign pipeline and endpoints')
+    parser.add_argument('--rows', default=','.join(str(n) for n in DEFAULT_ROWS),
+                        help='comma-separated export sizes (e.g. 1000,10000,500000)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement')
+    parser.add_argument('--requests', type=int, default=DEFAULT_REQUESTS,
+                        help='GET /seminarier.csv requests per run')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the synthetic exports')
+    parser.add_argument('--workdir', help='keep generated exports here and reuse them across runs')
+    parser.add_argument('-o', '--output', help='results file (default benchmark_results/<timestamp>.json)')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    args = parser.parse_args()
+
+    sizes = [int(n) for n in args.rows.split(',') if n.strip()]
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix='smartsign-bench-'))
+    storage = workdir / 'storage'
+    storage.mkdir(parents=True, exist_ok=True)
+
+    print("Measuring worker startup...")
+    startup = measure_startup(storage, args.repeat)
+
+    # server.py picks its storage directory at import, so point it at the scratch dir first
+    os.environ['STORAGE_PATH'] = str(storage)
+    import server
+    server.CSV_PATH = storage / 'seminarier.csv'
+    logging.getLogger('server').setLevel(logging.WARNING)
+    logging.getLogger('pipeline').setLevel(logging.WARNING)
+    server.access_log.stream = open(os.devnull, 'w')
+
+    try:
+        results = []
+        for rows in sizes:
+            print(f"Benchmarking {rows} rows...")
+            results.append(benchmark_size(server, rows, workdir, args))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'requests': args.requests,
+        'seed': args.seed,
+        'startup': startup,
+        'results': results,
+    }
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding='utf-8')
+
+    baseline = None
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding='utf-8'))
+    if startup is not None:
+        print_startup(startup, baseline)
+    print_results(results, baseline)
+    print(f"\nResults written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
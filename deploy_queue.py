@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Background deploy queue for the admin server
+Uploads only request a deploy; one worker thread waits until requests have been quiet
+for DEBOUNCE_SECONDS and then runs the deploy steps once for the whole burst. Requests
+made while a deploy runs are picked up by the next one, so deploys never overlap.
+
+DEPLOY_COMMAND overrides the deploy command (e.g. DEPLOY_COMMAND="echo deployed" to stub
+it out locally); DEPLOY_DEBOUNCE sets the quiet period in seconds.
+"""
+
+import os
+import shlex
+import shutil
+import subprocess
+import threading
+import time
+from datetime import datetime
+
+# Quiet period before a deploy starts, and the longest a burst can hold it back
+DEBOUNCE_SECONDS = 10.0
+MAX_DELAY_SECONDS = 60.0
+# Seconds each deploy step may run
+STEP_TIMEOUT = 120
+
+# Where the Railway CLI may live when DEPLOY_COMMAND is not set (first one found wins)
+RAILWAY_PATHS = [
+    'railway',  # Try standard PATH first
+    'railway.cmd',  # Windows command wrapper
+    os.path.expanduser('~/.npm-global/railway'),  # npm global
+    os.path.expanduser('~/.npm-global/railway.cmd'),  # npm global (Windows)
+    'C:\\Users\\chrwah28.KVA\\.npm-global\\railway',  # Specific user path
+    'C:\\Users\\chrwah28.KVA\\.npm-global\\railway.cmd',  # Specific user path (Windows)
+]
+
+
+def resolve_command(command=None):
+    """Deploy command as an argument list with its executable resolved (None if not found)
+    command is a string or list; without one, DEPLOY_COMMAND or "railway up" from the
+    first of RAILWAY_PATHS that exists.
+    """
+    if command is None:
+        command = os.environ.get('DEPLOY_COMMAND')
+    if command is None:
+        candidates = [[path, 'up'] for path in RAILWAY_PATHS]
+    else:
+        candidates = [shlex.split(command) if isinstance(command, str) else list(command)]
+
+    for args in candidates:
+        executable = shutil.which(args[0]) if args else None
+        if executable is not None:
+            return [executable] + args[1:]
+    return None
+
+
+class DeployQueue:
+    """Debounced, coalescing deploys run by a single background worker
+    steps are commands (argument lists) run in cwd before the deploy command, e.g. the
+    git add/commit of the generated CSV; their failures are ignored. The deploy command
+    is resolved once, on the first deploy. status() describes the queue for clients.
+    """
+
+    def __init__(self, cwd, steps=(), command=None, debounce=None, max_delay=MAX_DELAY_SECONDS,
+                 timeout=STEP_TIMEOUT):
+        self.cwd = cwd
+        self.steps = [list(step) for step in steps]
+        self.command = command
+        self.resolved = None
+        if debounce is None:
+            debounce = float(os.environ.get('DEPLOY_DEBOUNCE', DEBOUNCE_SECONDS))
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.timeout = timeout
+
+        self.condition = threading.Condition()
+        self.pending = 0
+        self.first_requested = None
+        self.last_requested = None
+        self.state = 'idle'
+        self.deploys = 0
+        self.last_deploy = None
+        self.worker = None
+
+    def request(self):
+        """Ask for a deploy (returns at once); returns the queue status"""
+        with self.condition:
+            now = time.monotonic()
+            if not self.pending:
+                self.first_requested = now
+            self.pending += 1
+            self.last_requested = now
+            if self.state == 'idle':
+                self.state = 'pending'
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self.run_forever, name='deploy-queue', daemon=True)
+                self.worker.start()
+            self.condition.notify_all()
+        return self.status()
+
+    def status(self):
+        """State ('idle', 'pending' or 'deploying'), requests waiting and the last deploy's result"""
+        with self.condition:
+            return {
+                'state': self.state,
+                'pending_requests': self.pending,
+                'deploys': self.deploys,
+                'last_deploy': dict(self.last_deploy) if self.last_deploy else None,
+            }
+
+    def run_forever(self):
+        while True:
+            requests = self.wait_for_burst()
+            started = datetime.now().isoformat(timespec='seconds')
+            success, message = self.deploy()
+            with self.condition:
+                self.deploys += 1
+                self.last_deploy = {
+                    'success': success,
+                    'message': message,
+                    'requests': requests,
+                    'started_at': started,
+                    'finished_at': datetime.now().isoformat(timespec='seconds'),
+                }
+                self.state = 'pending' if self.pending else 'idle'
+
+    def wait_for_burst(self):
+        """Block until requests have been quiet for debounce seconds (or max_delay passed)
+        Takes the waiting requests and returns how many there were.
+        """
+        with self.condition:
+            while True:
+                if not self.pending:
+                    self.condition.wait()
+                    continue
+                now = time.monotonic()
+                ready_at = min(self.last_requested + self.debounce, self.first_requested + self.max_delay)
+                if now >= ready_at:
+                    requests, self.pending = self.pending, 0
+                    self.state = 'deploying'
+                    return requests
+                self.condition.wait(ready_at - now)
+
+    def deploy(self):
+        """Run the steps and the deploy command; returns (success, message)"""
+        try:
+            for step in self.steps:
+                subprocess.run(step, cwd=self.cwd, capture_output=True, check=False, timeout=self.timeout)
+
+            if self.resolved is None:
+                self.resolved = resolve_command(self.command)
+            if self.resolved is None:
+                return False, "Deploy command not found. Install the Railway CLI with: npm install -g @railway/cli"
+
+            result = subprocess.run(self.resolved, cwd=self.cwd, capture_output=True, text=True,
+                                    timeout=self.timeout)
+            if result.returncode == 0:
+                return True, "Deployed successfully"
+            return False, f"Deployment failed: {result.stderr.strip() or result.stdout.strip()}"
+
+        except FileNotFoundError:
+            # The resolved executable went away; look it up again next time
+            self.resolved = None
+            return False, "Deploy command not found"
+        except subprocess.TimeoutExpired:
+            return False, "Deployment timed out (taking longer than expected)"
+        except Exception as e:
+            return False, f"Deployment error: {str(e)}"
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+Which events the displays show: the display week, the website tag and expiry times
+Shared by server.py and pipeline.py; kept free of pandas so request workers can import it.
+"""
+
+from datetime import datetime, timedelta
+
+# Minute-resolution local timestamps; sorts lexicographically in time order
+EXPIRY_FORMAT = '%Y-%m-%dT%H:%M'
+
+# Tag that marks an event for the displays
+WEBSITE_TAG = 'website'
+
+
+def get_current_week_start(today=None):
+    """Get Monday of week to display
+    - Mon-Thu: current week
+    - Fri-Sun: next week
+    """
+    if today is None:
+        today = datetime.now().date()
+    monday = today - timedelta(days=today.weekday())
+    # If Friday or later, show next week
+    if today.weekday() >= 4:
+        monday = monday + timedelta(days=7)
+    return monday
+
+
+def get_current_week_end(today=None):
+    """Get Friday of week to display"""
+    start = get_current_week_start(today)
+    return start + timedelta(days=4)
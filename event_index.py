@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+In-memory index of workbook events for date-range queries (see /api/events)
+Events are kept sorted by start, with posting lists per location and per tag. A query
+binary-searches its start position and scans forward only over candidates, so month
+views and room schedules cost microseconds whatever the size of the workbook.
+"""
+
+import base64
+import bisect
+import json
+from datetime import date, timedelta
+
+# Events per page when a query gives no limit, and the most it may ask for
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+def normalize(value):
+    """Lowercased, stripped text for matching locations and tags ('' when missing)"""
+    return str(value or '').strip().lower()
+
+
+def event_key(event):
+    """Sort key of an event: (date, start time, source row)"""
+    return event['date'], event['start_time'], event['row']
+
+
+def encode_cursor(key):
+    """Opaque page cursor for a sort key"""
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Sort key from encode_cursor (ValueError if malformed)"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("invalid cursor")
+    if (not isinstance(key, list) or len(key) != 3 or not isinstance(key[0], str)
+            or not isinstance(key[1], str) or not isinstance(key[2], int)):
+        raise ValueError("invalid cursor")
+    return tuple(key)
+
+
+class EventIndex:
+    """Events sorted by event_key, with positions by location and by tag
+    events are dicts with 'row' (source row number), 'date' and 'end_date' (ISO dates),
+    'start_time' ('HH:MM' or ''), 'location' and 'tags' plus whatever is returned to
+    clients. An event matches a date range when its [date, end_date] interval overlaps
+    it; the longest event bounds how far before the range a match can start.
+    """
+
+    def __init__(self, events, source_key=None):
+        self.source_key = source_key
+        self.events = sorted(events, key=event_key)
+        self.keys = [event_key(event) for event in self.events]
+        self.max_span_days = max((
+            (date.fromisoformat(event['end_date']) - date.fromisoformat(event['date'])).days
+            for event in self.events), default=0)
+
+        self.by_location = {}
+        self.by_tag = {}
+        for position, event in enumerate(self.events):
+            self.by_location.setdefault(normalize(event['location']), []).append(position)
+            for tag in event['tags']:
+                self.by_tag.setdefault(tag, []).append(position)
+
+    def __len__(self):
+        return len(self.events)
+
+    def query(self, first=None, last=None, location=None, tag=None, cursor=None, limit=DEFAULT_LIMIT):
+        """Events overlapping [first, last] (date objects, None for open), in start order
+        location and tag match exactly after normalize(). cursor continues a previous
+        page. Returns (events, cursor for the next page or None).
+        """
+        start = 0
+        if first is not None:
+            earliest = (first - timedelta(days=self.max_span_days)).isoformat()
+            start = bisect.bisect_left(self.keys, (earliest,))
+        if cursor is not None:
+            start = max(start, bisect.bisect_right(self.keys, decode_cursor(cursor)))
+
+        # Scan the shortest posting list that applies, else the whole order
+        postings = []
+        if location is not None:
+            postings.append(self.by_location.get(normalize(location), []))
+        if tag is not None:
+            postings.append(self.by_tag.get(normalize(tag), []))
+        if postings:
+            posting = min(postings, key=len)
+            positions = (posting[i] for i in range(bisect.bisect_left(posting, start), len(posting)))
+        else:
+            positions = range(start, len(self.events))
+
+        first_iso = first.isoformat() if first is not None else None
+        last_iso = last.isoformat() if last is not None else None
+        location = normalize(location) if location is not None else None
+        tag = normalize(tag) if tag is not None else None
+
+        matches = []
+        for position in positions:
+            event = self.events[position]
+            if last_iso is not None and event['date'] > last_iso:
+                break
+            if first_iso is not None and event['end_date'] < first_iso:
+                continue
+            if location is not None and normalize(event['location']) != location:
+                continue
+            if tag is not None and tag not in event['tags']:
+                continue
+            # One match past the page tells whether there is a next page
+            if len(matches) == limit:
+                return matches, encode_cursor(event_key(matches[-1]))
+            matches.append(event)
+        return matches, None
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite store of ProjectPlace events, keyed by the export's Id column
+Uploads are merged into the store (upsert by Id) or replace its contents, and the
+pipeline and /api/events read from it instead of re-parsing the last workbook. Each
+event also keeps its display title and speaker, normalized once per fingerprint of the
+fields they derive from. The database runs in WAL mode, so every worker can read while
+one writes.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# Columns of the events table, in the order rows are passed around
+STORE_FIELDS = ('id', 'title', 'description', 'speaker', 'tags', 'location',
+                'start_date', 'start_time', 'end_date', 'end_time')
+
+# Source fields the display title and speaker are derived from (see fingerprint)
+FINGERPRINT_FIELDS = ('title', 'description', 'speaker')
+# Derived columns stored with each event, returned after STORE_FIELDS by query()
+NORMALIZED_FIELDS = ('display_title', 'display_speaker')
+# Columns added to events after the first release, created on existing databases
+ADDED_COLUMNS = ('fingerprint',) + NORMALIZED_FIELDS
+
+# Ids per SELECT ... IN (...) (SQLite limits bound parameters)
+ID_BATCH = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    description TEXT,
+    speaker TEXT,
+    tags TEXT,
+    location TEXT,
+    start_date TEXT,
+    start_time TEXT,
+    end_date TEXT,
+    end_time TEXT,
+    fingerprint TEXT,
+    display_title TEXT,
+    display_speaker TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_start ON events (start_date, start_time);
+CREATE INDEX IF NOT EXISTS events_location ON events (location COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS event_tags (
+    tag TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    PRIMARY KEY (tag, event_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS event_tags_event ON event_tags (event_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_FINGERPRINT_POSITIONS = [STORE_FIELDS.index(name) for name in FINGERPRINT_FIELDS]
+
+
+def fingerprint(row):
+    """Short hash of the FINGERPRINT_FIELDS of a row (a changed hash means re-normalizing)"""
+    text = '\x1f'.join('\x00' if row[pos] is None else row[pos] for pos in _FINGERPRINT_POSITIONS)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def split_tags(text):
+    """Tag(s) cell as a sorted list of lowercased tags ("Website;seminar" -> ['seminar', 'website'])"""
+    return sorted({tag.strip().lower() for tag in re.split('[;,]', text or '') if tag.strip()})
+
+
+class EventStore:
+    """Events in a SQLite database, upserted by id
+    Rows are tuples in STORE_FIELDS order; start_date and end_date are ISO dates (None
+    when the export had none). normalize(rows) callables return a (display_title,
+    display_speaker) pair per row. Every change bumps a revision number, so readers in
+    any process can tell when to refresh what they derived from the store.
+    """
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def connect(self):
+        """This thread's connection (a new one after fork)"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None or self.local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(events)')}
+            for name in ADDED_COLUMNS:
+                if name not in columns:
+                    conn.execute(f'ALTER TABLE events ADD COLUMN {name} TEXT')
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
+
+    def revision(self):
+        """Number of changes made to the store so far (0 when it was never written)"""
+        row = self.connect().execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()
+        return int(row[0]) if row else 0
+
+    def count(self):
+        return self.connect().execute('SELECT COUNT(*) FROM events').fetchone()[0]
+
+    def existing_rows(self, conn, ids):
+        """Stored rows plus their fingerprint for the given ids (every row when ids is None), by id"""
+        columns = ', '.join(STORE_FIELDS + ('fingerprint',))
+        if ids is None:
+            return {row[0]: row for row in conn.execute(f'SELECT {columns} FROM events')}
+        ids = list(ids)
+        existing = {}
+        for start in range(0, len(ids), ID_BATCH):
+            batch = ids[start:start + ID_BATCH]
+            placeholders = ', '.join('?' * len(batch))
+            for row in conn.execute(f'SELECT {columns} FROM events WHERE id IN ({placeholders})', batch):
+                existing[row[0]] = row
+        return existing
+
+    def ingest(self, rows, normalize, replace=False):
+        """Upsert rows by id in one transaction; with replace, events not in rows are deleted
+        Rows equal to what is stored are left alone, and only rows whose fingerprint is new
+        or changed go through normalize. Returns the counts {'added', 'changed', 'removed',
+        'reused'}, reused being stored rows whose normalized fields were kept.
+        """
+        rows = {row[0]: tuple(row) for row in rows}
+        conn = self.connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            existing = self.existing_rows(conn, None if replace else rows.keys())
+            written = []
+            stale = []
+            for event_id, row in rows.items():
+                stored = existing.get(event_id)
+                if stored is None or stored[-1] != fingerprint(row):
+                    stale.append(row)
+                elif stored[:-1] != row:
+                    written.append(row)
+            removed = [event_id for event_id in existing if event_id not in rows] if replace else []
+
+            # Rows keeping their fingerprint keep their normalized fields (not in the upsert)
+            self.upsert(conn, written, STORE_FIELDS)
+            self.upsert(conn, [row + (fingerprint(row),) + tuple(normalized)
+                               for row, normalized in zip(stale, normalize(stale) if stale else [])],
+                        STORE_FIELDS + ('fingerprint',) + NORMALIZED_FIELDS)
+            written += stale
+            if written:
+                tags_pos = STORE_FIELDS.index('tags')
+                conn.executemany('DELETE FROM event_tags WHERE event_id = ?', [(row[0],) for row in written])
+                conn.executemany('INSERT INTO event_tags (tag, event_id) VALUES (?, ?)',
+                                 [(tag, row[0]) for row in written for tag in split_tags(row[tags_pos])])
+            if removed:
+                conn.executemany('DELETE FROM events WHERE id = ?', [(event_id,) for event_id in removed])
+                conn.executemany('DELETE FROM event_tags WHERE event_id = ?', [(event_id,) for event_id in removed])
+            if written or removed:
+                conn.execute("INSERT INTO meta (key, value) VALUES ('revision', '1') "
+                             "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1")
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+        added = sum(1 for event_id in rows if event_id not in existing)
+        return {
+            'added': added,
+            'changed': len(written) - added,
+            'removed': len(removed),
+            'reused': len(rows) - len(stale),
+        }
+
+    def upsert(self, conn, rows, columns):
+        """Insert rows (tuples of columns, id first) or update the given columns of existing ones"""
+        if not rows:
+            return
+        now = time.time()
+        updates = ', '.join(f'{name} = excluded.{name}' for name in columns[1:])
+        conn.executemany(
+            f"INSERT INTO events ({', '.join(columns)}, updated_at) "
+            f"VALUES ({', '.join('?' * (len(columns) + 1))}) "
+            f"ON CONFLICT (id) DO UPDATE SET {updates}, updated_at = excluded.updated_at",
+            [tuple(row) + (now,) for row in rows])
+
+    def normalize_missing(self, normalize):
+        """Normalize stored rows that have no fingerprint yet (databases from before fingerprints)
+        Returns the number of rows normalized.
+        """
+        conn = self.connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute(f"SELECT {', '.join(STORE_FIELDS)} FROM events WHERE fingerprint IS NULL").fetchall()
+            if rows:
+                conn.executemany(
+                    'UPDATE events SET fingerprint = ?, display_title = ?, display_speaker = ? WHERE id = ?',
+                    [(fingerprint(row),) + tuple(normalized) + (row[0],)
+                     for row, normalized in zip(rows, normalize(rows))])
+                conn.execute("INSERT INTO meta (key, value) VALUES ('revision', '1') "
+                             "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1")
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return len(rows)
+
+    def query_with_revision(self):
+        """(revision, every dated event as query() returns them), read in one transaction
+        A plain read in WAL mode: it sees the last commit and never waits for a writer.
+        """
+        conn = self.connect()
+        conn.execute('BEGIN')
+        try:
+            return self.revision(), self.query()
+        finally:
+            conn.execute('COMMIT')
+
+    def query(self, first=None, last=None, location=None, tag=None):
+        """Dated events starting in [first, last] (ISO dates, None for open), in start order
+        Rows are STORE_FIELDS followed by NORMALIZED_FIELDS. location matches
+        case-insensitively and tag exactly (see split_tags); each filter runs on its index.
+        """
+        conditions = ['e.start_date IS NOT NULL']
+        params = []
+        if first is not None:
+            conditions.append('e.start_date >= ?')
+            params.append(first)
+        if last is not None:
+            conditions.append('e.start_date <= ?')
+            params.append(last)
+        if location is not None:
+            conditions.append('e.location = ? COLLATE NOCASE')
+            params.append(location.strip())
+        join = ''
+        if tag is not None:
+            join = 'JOIN event_tags t ON t.event_id = e.id AND t.tag = ?'
+            params.insert(0, tag.strip().lower())
+
+        columns = ', '.join(f'e.{name}' for name in STORE_FIELDS + NORMALIZED_FIELDS)
+        return self.connect().execute(
+            f"SELECT {columns} FROM events e {join} WHERE {' AND '.join(conditions)} "
+            f"ORDER BY e.start_date, e.start_time, e.id", params).fetchall()
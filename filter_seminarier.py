@@ -14,42 +14,21 @@ from html import unescape
 from pathlib import Path
 import glob
 
+from speakers import SpeakerCache, speaker_from_html
+
+# Cache för extraherade talare (per event-Id + hash av beskrivningen)
+SPEAKER_CACHE_FILE = Path(__file__).parent / 'speakers_filter.json'
+
 def extract_speaker(html_description):
     """
     Extraherar talare från HTML-beskrivning
     Letar efter <b>Speaker</b> följt av namn och institution
+    (hela kolumner går via speakers.extract_speakers / SpeakerCache)
     """
     if pd.isna(html_description) or not html_description:
         return ""
 
-    clean = unescape(str(html_description))
-
-    # Look for <b>Speaker</b> tag
-    if '<b>Speaker</b>' in clean:
-        start_idx = clean.find('<b>Speaker</b>') + len('<b>Speaker</b>')
-
-        # Skip the first <br> tag (usually right after <b>Speaker</b>)
-        br_idx = clean.find('<br', start_idx)
-        if br_idx != -1:
-            br_end = clean.find('>', br_idx)
-            if br_end != -1:
-                start_idx = br_end + 1
-
-        # Find next <br> tag (end of speaker line)
-        end_idx = clean.find('<br', start_idx)
-        if end_idx == -1:
-            end_idx = start_idx + 200
-
-        speaker_text = clean[start_idx:end_idx].strip()
-        # Remove all HTML tags (including </p>, <br>, etc)
-        speaker_text = re.sub(r'<[^>]+>', '', speaker_text).strip()
-        # Take only first line (stop at newline before Abstract/etc)
-        speaker_text = speaker_text.split('\n')[0].strip()
-        # Clean up whitespace
-        speaker_text = ' '.join(speaker_text.split())
-        return speaker_text if speaker_text else ""
-
-    return ""
+    return speaker_from_html(unescape(str(html_description)))
 
 def format_time(timedelta_obj):
     """
@@ -152,9 +131,12 @@ def main():
             print("\n[VARNING] Inga seminarier hittade for denna vecka!")
             print("          Skapar tom CSV-fil...")
 
-        # Extrahera talare från Description
+        # Extrahera talare från Description (endast nya/ändrade beskrivningar)
         print("\nExtraherar talare fran HTML-beskrivningar...")
-        df_filtered['Speaker'] = df_filtered['Description'].apply(extract_speaker)
+        speaker_cache = SpeakerCache(SPEAKER_CACHE_FILE, unescape_html=True)
+        df_filtered['Speaker'], extracted = speaker_cache.extract(df_filtered['Id'], df_filtered['Description'])
+        speaker_cache.save()
+        print(f"Talare extraherade: {extracted} (ovriga fran cache)")
 
         # Formatera tid
         df_filtered['Time_Start'] = df_filtered['Start time'].apply(format_time)
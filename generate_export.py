@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic ProjectPlace program exports for benchmarking
+Builds workbooks with the same columns as preview.csv (Id, Start date, Start time as a
+duration, HTML Description, Tag(s), Room location, ...) at any size from a few rows to
+hundreds of thousands. The same rows and seed always give the same export.
+
+Usage: python generate_export.py 100000 -o export.xlsx [--seed 1] [--csv]
+"""
+
+import argparse
+import random
+from datetime import datetime, timedelta
+
+import openpyxl
+import pandas as pd
+
+# Column order of a ProjectPlace export (see preview.csv)
+EXPORT_COLUMNS = [
+    'Id', 'Start date', 'Start time', 'End date', 'End time', 'Title', 'Description',
+    'Track', 'Tag(s)', 'Room location', 'Group(s)',
+]
+
+# Sheet name ProjectPlace gives the export
+EXPORT_SHEET = 'ExportedPrograms'
+
+# Events are spread over this many days on each side of the base date
+DATE_SPREAD_DAYS = 182
+
+ROOMS = ['Kuskvillan', 'Gula villan', 'Main building', 'Seminar room', 'Lecture hall', None]
+TAGS = ['website'] * 11 + ['website;seminar', 'internal', 'staff'] + [None] * 6
+FIRST_NAMES = ['Leslie', 'Björn', 'Nanna', 'Travis', 'Antonio', 'Michael', 'Erik', 'Joar', 'Anna', 'Maria',
+               'Karin', 'Johan', 'Sofia', 'Lars', 'Ingrid', 'Pierre', 'Yuki', 'Chen', 'Amir', 'Elena']
+LAST_NAMES = ['Greengard', 'Engquist', 'Berre', 'Askham', 'Huerta', "O'Neil", 'Burman', 'Bagge', 'Lindqvist',
+              'Andersson', 'Nilsson', 'Dubois', 'Tanaka', 'Wang', 'Haddad', 'Rossi', 'Karlsson', 'Svensson']
+INSTITUTIONS = ['New York University', 'KTH Royal Institute of Technology', 'Uppsala University',
+                'University of Oslo', 'Stockholm University', 'UPC Barcelona', 'Flatiron Institute',
+                'University College London', 'Chalmers', 'ETH Zürich']
+TOPICS = ['Rigid particles and deformable capsules in wall-bounded Stokes flow',
+          'Unfitted finite element methods for ill-posed interface problems',
+          'Cut Finite Element Methods for Poroelasticity', 'Mie scattering in layered media',
+          'NURBS-Embedded HDG for Incompressible Flows',
+          'Numerical Methodologies for Multiscale Limits, homogenization and interfaces',
+          'Integral formulations for a class of half-space interface problems',
+          'Fast algorithms for layer and volume potentials', 'Random matrices and free probability',
+          'Geometric flows and singularities']
+SOCIAL_TITLES = ['Morning coffee', 'Lunch', 'Coffeebreak', 'Welcome', 'Welcome to IML: Informal get together']
+SENTENCES = ['Over the last two decades, a variety of fast, robust, and high-order accurate methods have '
+             'been developed for solving elliptic and parabolic PDEs in complicated geometry.',
+             'In this approach, rather than discretizing the partial differential equation itself, one '
+             'first evaluates a volume integral to account for the source distribution.',
+             'We present a new set of algorithms and discuss their performance on large problems.',
+             'This is joint work with collaborators at several institutions.',
+             'The talk is aimed at a general mathematical audience.',
+             'Numerical experiments illustrate the accuracy and efficiency of the method.']
+
+
+def speaker_description(speaker, institution, rng):
+    """HTML description in one of the two ProjectPlace speaker layouts"""
+    abstract = '<br />\n'.join(rng.sample(SENTENCES, rng.randint(1, 4)))
+    if rng.random() < 0.5:
+        return f'<p><b>Speaker</b><br />\n{speaker},{institution}<br />\n<br />\n<b>Abstract</b><br />\n{abstract}</p>\n'
+    return f'<p><b>Speaker</b><br/>{speaker}, {institution}<br/><b>Abstract</b><br/>{abstract}</p>'
+
+
+def generate_export(rows, seed=0, base_date=None):
+    """Build a synthetic export DataFrame with EXPORT_COLUMNS
+    Dates spread DATE_SPREAD_DAYS around base_date (default today); start and end times
+    are Timedeltas, which print as "0 days HH:MM:SS" like preview.csv.
+    """
+    rng = random.Random(seed)
+    if base_date is None:
+        base_date = datetime.now().date()
+    first_day = datetime(base_date.year, base_date.month, base_date.day) - timedelta(days=DATE_SPREAD_DAYS)
+
+    records = []
+    for i in range(rows):
+        day = first_day + timedelta(days=rng.randint(0, 2 * DATE_SPREAD_DAYS))
+        start = timedelta(hours=rng.randint(8, 18), minutes=rng.choice([0, 15, 30, 45]))
+        end = start + timedelta(minutes=rng.choice([15, 30, 45, 60, 90]))
+
+        kind = rng.random()
+        if kind < 0.35:
+            title = rng.choice(SOCIAL_TITLES)
+            description = rng.choice([None, None, '<p>Gathering in "Blomsterrummet" for coffee.</p>\n'])
+        else:
+            speaker = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+            topic = rng.choice(TOPICS)
+            title = f'WS, {speaker}: {topic}' if kind < 0.8 else topic
+            description = speaker_description(speaker, rng.choice(INSTITUTIONS), rng)
+
+        records.append((
+            120000 + i, day, start, day, end, title, description,
+            None, rng.choice(TAGS), rng.choice(ROOMS), None,
+        ))
+
+    df = pd.DataFrame.from_records(records, columns=EXPORT_COLUMNS)
+    df['Start time'] = pd.to_timedelta(df['Start time'])
+    df['End time'] = pd.to_timedelta(df['End time'])
+    return df
+
+
+def write_export(df, path):
+    """Write an export DataFrame as a single-sheet .xlsx (streamed, so large exports fit in memory)
+    Times are written as durations, which openpyxl and pandas read back as timedeltas.
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(EXPORT_SHEET)
+    sheet.append(list(df.columns))
+
+    # pandas Timedelta/Timestamp subclass timedelta/datetime, so openpyxl writes them natively
+    columns = [df[name].astype(object).where(df[name].notna(), None) for name in df.columns]
+    for row in zip(*columns):
+        sheet.append(row)
+    workbook.save(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic ProjectPlace program export')
+    parser.add_argument('rows', type=int, help='number of events')
+    parser.add_argument('-o', '--output', default='synthetic_export.xlsx', help='output file')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    parser.add_argument('--csv', action='store_true', help='write CSV (like preview.csv) instead of Excel')
+    args = parser.parse_args()
+
+    df = generate_export(args.rows, seed=args.seed)
+    if args.csv:
+        df['Start date'] = df['Start date'].dt.strftime('%Y-%m-%d')
+        df['End date'] = df['End date'].dt.strftime('%Y-%m-%d')
+        df.to_csv(args.output, index=False)
+    else:
+        write_export(df, args.output)
+    print(f"Wrote {len(df)} events to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""
+Gunicorn settings for the SmartSign server
+Loaded automatically by gunicorn from the working directory (Procfile / railway.json)
+"""
+
+import os
+import uuid
+
+# The one place for worker settings: Procfile and railway.json both start plain
+# "gunicorn server:app". Every display's /events stream holds a thread (up to
+# server.EVENTS_MAX_STREAMS per worker), so threads stays well above that cap.
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = 'gthread'
+threads = 16
+timeout = 120
+
+
+def on_starting(server):
+    """Give this run's workers a shared run ID (server.py keeps their metrics per run)"""
+    os.environ['SMARTSIGN_RUN_ID'] = uuid.uuid4().hex
+
+
+def post_worker_init(worker):
+    """Let every worker compete for the scheduler lock - exactly one runs the daily filter"""
+    import server
+    server.start_scheduler_leader()
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Prometheus metrics shared across gunicorn workers
+Every process keeps its counters, gauges and histograms in memory and flushes them to
+<directory>/<pid>.json every few seconds. render() merges the files of all live
+processes into the Prometheus text format, so /metrics reports the same totals
+whichever worker answers it.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+# Histogram buckets (seconds) for request latency and pipeline stage durations
+REQUEST_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Seconds between background flushes of a process's metrics file
+FLUSH_INTERVAL = 5.0
+
+
+def process_alive(pid):
+    """Whether a process with this PID exists (always True where it can't be checked)"""
+    if os.name != 'posix':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def format_value(value):
+    """Prometheus sample value"""
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def format_labels(labels):
+    """{k="v",...} with Prometheus escaping ('' when there are no labels)"""
+    if not labels:
+        return ''
+    escaped = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{key}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+class Metrics:
+    """Counters, gauges and histograms aggregated over all processes sharing a directory
+    Counters and histograms are summed across processes; for gauges the most recently
+    set value wins. Files of processes that no longer exist are removed, so their
+    counts drop out of the totals (Prometheus treats that as a counter reset).
+    """
+
+    def __init__(self, directory, flush_interval=FLUSH_INTERVAL):
+        self.directory = Path(directory)
+        self.flush_interval = flush_interval
+        self.definitions = {}
+        self.reset()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self.reset)
+        atexit.register(self.flush)
+
+    def reset(self):
+        """Start with no samples (also run in forked children, which must not re-report the parent)"""
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.series = {}
+        self.dirty = False
+        self.flusher = None
+
+    def counter(self, name, help_text):
+        self.definitions[name] = ('counter', help_text, None)
+
+    def gauge(self, name, help_text):
+        self.definitions[name] = ('gauge', help_text, None)
+
+    def histogram(self, name, help_text, buckets):
+        self.definitions[name] = ('histogram', help_text, tuple(buckets))
+
+    def inc(self, name, value=1, **labels):
+        """Add value to a counter"""
+        with self.lock:
+            key = (name, tuple(sorted(labels.items())))
+            self.series[key] = self.series.get(key, 0) + value
+            self.mark_dirty()
+
+    def set(self, name, value, **labels):
+        """Set a gauge"""
+        with self.lock:
+            self.series[(name, tuple(sorted(labels.items())))] = [value, time.time()]
+            self.mark_dirty()
+
+    def observe(self, name, value, **labels):
+        """Record one observation in a histogram"""
+        buckets = self.definitions[name][2]
+        with self.lock:
+            key = (name, tuple(sorted(labels.items())))
+            sample = self.series.get(key)
+            if sample is None:
+                sample = self.series[key] = {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    sample['buckets'][i] += 1
+                    break
+            sample['sum'] += value
+            sample['count'] += 1
+            self.mark_dirty()
+
+    def mark_dirty(self):
+        """Note unflushed samples and make sure the background flusher is running (lock held)"""
+        self.dirty = True
+        if self.flusher is None:
+            self.flusher = threading.Thread(target=self.flush_periodically, name='metrics-flush', daemon=True)
+            self.flusher.start()
+
+    def flush_periodically(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def samples(self):
+        """This process's samples as JSON-ready [name, labels, value] entries"""
+        with self.lock:
+            return json.loads(json.dumps([[name, labels, value] for (name, labels), value in self.series.items()]))
+
+    def flush(self):
+        """Write this process's samples to its file (temp file + rename) if anything changed"""
+        if not self.dirty:
+            return
+        self.dirty = False
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.directory / f'{self.pid}.json'
+            tmp_path = self.directory / f'.{self.pid}.tmp'
+            tmp_path.write_text(json.dumps({'pid': self.pid, 'series': self.samples()}), encoding='utf-8')
+            os.replace(tmp_path, path)
+        except OSError:
+            self.dirty = True
+
+    def collect(self):
+        """Merged samples of every live process: {(name, labels): value}"""
+        merged = {}
+
+        def add(name, labels, value):
+            key = (name, tuple(tuple(pair) for pair in labels))
+            kind = self.definitions.get(name, ('gauge',))[0]
+            current = merged.get(key)
+            if current is None:
+                merged[key] = value
+            elif kind == 'counter':
+                merged[key] = current + value
+            elif kind == 'histogram':
+                current['buckets'] = [a + b for a, b in zip(current['buckets'], value['buckets'])]
+                current['sum'] += value['sum']
+                current['count'] += value['count']
+            elif value[1] > current[1]:
+                merged[key] = value
+
+        for name, labels, value in self.samples():
+            add(name, labels, value)
+
+        for path in self.directory.glob('*.json'):
+            try:
+                pid = int(path.stem)
+            except ValueError:
+                continue
+            if pid == self.pid:
+                continue
+            if not process_alive(pid):
+                path.unlink(missing_ok=True)
+                continue
+            try:
+                data = json.loads(path.read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                continue
+            for name, labels, value in data.get('series', []):
+                if name in self.definitions:
+                    add(name, labels, value)
+
+        return merged
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        merged = self.collect()
+        lines = []
+        for name, (kind, help_text, buckets) in self.definitions.items():
+            samples = sorted((labels, value) for (series_name, labels), value in merged.items()
+                             if series_name == name)
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in samples:
+                if kind == 'counter':
+                    lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+                elif kind == 'gauge':
+                    lines.append(f'{name}{format_labels(labels)} {format_value(value[0])}')
+                else:
+                    cumulative = 0
+                    for bound, count in zip(buckets, value['buckets']):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{format_labels(labels + (("le", format_value(bound)),))} {cumulative}')
+                    lines.append(f'{name}_bucket{format_labels(labels + (("le", "+Inf"),))} {value["count"]}')
+                    lines.append(f'{name}_sum{format_labels(labels)} {format_value(value["sum"])}')
+                    lines.append(f'{name}_count{format_labels(labels)} {value["count"]}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,533 @@
+# -*- coding: utf-8 -*-
+"""
+Seminar processing pipeline: workbook ingestion, date parsing, filtering and speakers
+Everything here works on pandas DataFrames. server.py imports this module only when an
+upload, sync or scheduled run needs it, so workers that only serve displays never load
+pandas or openpyxl.
+"""
+
+import hashlib
+import logging
+import re
+import sys
+import zipfile
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import openpyxl
+from openpyxl.utils.exceptions import InvalidFileException
+
+from display_week import EXPIRY_FORMAT, WEBSITE_TAG, get_current_week_start, get_current_week_end
+from event_store import STORE_FIELDS, NORMALIZED_FIELDS
+from speakers import extract_speakers, speaker_from_html
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Export column for each STORE_FIELDS and NORMALIZED_FIELDS entry (store rows are turned
+# back into export-shaped frames)
+STORE_COLUMNS = {
+    'id': 'Id', 'title': 'Title', 'description': 'Description', 'speaker': 'Speaker',
+    'tags': 'Tag(s)', 'location': 'Room location', 'start_date': 'Start date',
+    'start_time': 'Start time', 'end_date': 'End date', 'end_time': 'End time',
+    'display_title': 'Display title', 'display_speaker': 'Display speaker',
+}
+
+# An 'HH:MM' time of day (End times that are not are ignored)
+TIME_OF_DAY = re.compile(r'\d{1,2}:\d{2}')
+
+
+def parse_date(date_value):
+    """Parse date from various formats"""
+    if pd.isna(date_value):
+        return None
+
+    if isinstance(date_value, str):
+        for fmt in ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d']:
+            try:
+                return pd.to_datetime(date_value, format=fmt).date()
+            except:
+                continue
+        try:
+            return pd.to_datetime(date_value).date()
+        except:
+            return None
+    else:
+        try:
+            return pd.to_datetime(date_value).date()
+        except:
+            return None
+
+
+def convert_timedelta_to_time_str(td_value):
+    """Convert timedelta seconds to HH:MM format"""
+    if pd.isna(td_value):
+        return None
+
+    try:
+        # If it's a timedelta object
+        if isinstance(td_value, timedelta):
+            total_seconds = int(td_value.total_seconds())
+            hours = total_seconds // 3600
+            minutes = (total_seconds % 3600) // 60
+            return f"{hours:02d}:{minutes:02d}"
+        # If it's already a string, return as is
+        elif isinstance(td_value, str):
+            return td_value
+        else:
+            return None
+    except:
+        return None
+
+
+def extract_speaker_from_description(desc_html):
+    """Extract speaker from HTML description
+    Supports two formats:
+    1. <b>Speaker</b><br/>Name, Institution<br/>
+    2. <b>Speaker</b><br />\\nName, Institution<br/>
+    (whole columns go through speakers.extract_speakers)
+    """
+    try:
+        return speaker_from_html(desc_html)
+    except Exception:
+        return ''
+
+
+# Date formats tried (in order) for string dates before falling back to auto-parsing
+DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d']
+# Cells sampled per column to infer which of DATE_FORMATS it uses
+DATE_SAMPLE_SIZE = 50
+
+# Sheet names tried (in order) before falling back to the first sheet
+SHEET_NAMES = ['Data', 'data', 'Seminars', 'seminars', 'Program', 'program', 'ExportedPrograms']
+
+# Columns ingested into the event store (ProjectPlace export and simple format); everything else is skipped
+PIPELINE_COLUMNS = [
+    'Id', 'Title', 'Tag(s)',
+    'Start date', 'Start time', 'End date', 'End time', 'Description', 'Room location',
+    'Date', 'Time', 'Speaker', 'Location',
+]
+
+
+def infer_date_format(strings):
+    """Pick the DATE_FORMATS entry that parses most of a sample of a string column
+    Returns None when no format matches any sampled cell.
+    """
+    step = max(1, len(strings) // DATE_SAMPLE_SIZE)
+    sample = strings.iloc[::step].iloc[:DATE_SAMPLE_SIZE]
+
+    best_format, best_hits = None, 0
+    for fmt in DATE_FORMATS:
+        hits = int(pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum())
+        if hits > best_hits:
+            best_format, best_hits = fmt, hits
+    return best_format
+
+
+def parse_date_column(values):
+    """Vectorized parse_date for a whole column
+    Returns (dates, fallback_cells): a datetime64 Series normalized to midnight (NaT where
+    parse_date would return None) and the number of cells that needed per-cell parsing.
+    String cells are converted in one call with the format inferred from a sample, and
+    date/datetime objects in one more; only the rest go through parse_date (once per
+    distinct value). DATE_FORMATS never overlap, so this matches per-cell parse_date.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        if getattr(values.dt, 'tz', None) is not None:
+            values = values.dt.tz_localize(None)
+        return values.dt.normalize(), 0
+
+    parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    present = values[values.notna()]
+    kinds = present.map(lambda v: 's' if isinstance(v, str) else
+                        'd' if isinstance(v, date) and getattr(v, 'tzinfo', None) is None else '')
+
+    strings = present[kinds == 's']
+    date_format = infer_date_format(strings) if not strings.empty else None
+    if date_format is not None:
+        converted = pd.to_datetime(strings, format=date_format, errors='coerce')
+        hit = converted.notna()
+        parsed.loc[converted.index[hit]] = converted[hit].dt.normalize()
+        strings = strings[~hit]
+
+    dates = present[kinds == 'd']
+    if not dates.empty:
+        parsed.loc[dates.index] = pd.to_datetime(dates.map(pd.Timestamp)).dt.normalize()
+
+    # Other formats, auto-parsing and odd cell types keep the exact per-cell semantics
+    leftover = pd.concat([strings, present[kinds == '']])
+    if not leftover.empty:
+        try:
+            distinct = {value: parse_date(value) for value in pd.unique(leftover)}
+            fallback = leftover.map(distinct)
+        except TypeError:  # Unhashable cell values
+            fallback = leftover.map(parse_date)
+        fallback = pd.to_datetime(fallback, errors='coerce')
+        parsed.loc[fallback.index[fallback.notna()]] = fallback.dropna()
+
+    return parsed, len(leftover)
+
+
+def convert_timedelta_column(values):
+    """Vectorized convert_timedelta_to_time_str for a whole column (None where unparseable)"""
+    if pd.api.types.is_timedelta64_dtype(values):
+        total_seconds = values.dt.total_seconds()
+        valid = total_seconds.notna()
+        seconds = total_seconds[valid].astype('int64')
+        hours = (seconds // 3600).astype(str).str.zfill(2)
+        minutes = ((seconds % 3600) // 60).astype(str).str.zfill(2)
+        result = pd.Series(None, index=values.index, dtype=object)
+        result[valid] = hours + ':' + minutes
+        return result
+
+    return values.map(convert_timedelta_to_time_str).astype(object)
+
+
+def split_speaker_from_title(title, speaker):
+    """Apply the title/speaker heuristics to one event
+    Returns (title, speaker) after "Name: Title" parsing and speaker-prefix removal
+    """
+    # Smart parsing: If speaker is empty but title contains "Name: Title" format, parse it
+    # e.g., "Genming Bai: TBA" → Speaker="Genming Bai", Title="TBA"
+    if (not speaker or str(speaker).strip() == '' or str(speaker).lower() == 'nan') and ':' in str(title):
+        parts = str(title).split(':', 1)
+        if len(parts) == 2:
+            potential_speaker = parts[0].strip()
+            potential_title = parts[1].strip()
+
+            # Only parse if left side looks like a person's name (not a course code or long title)
+            # Heuristics:
+            # - Should be relatively short (< 60 chars, typically names are 20-40 chars)
+            # - Should not contain numbers at the start (like "FSF3571")
+            # - Should not contain certain course-like keywords ("course", "lecture", "module", "seminar" in the left part)
+            # - Should not contain slashes or URLs
+            course_keywords = ['course', 'lecture', 'module', 'seminar', 'workshop', 'session', 'tutorial']
+            has_course_keyword = any(keyword in potential_speaker.lower() for keyword in course_keywords)
+            looks_like_code = potential_speaker and potential_speaker[0].isdigit()
+
+            if (potential_speaker and len(potential_speaker) < 60 and
+                not has_course_keyword and not looks_like_code and
+                not potential_speaker.startswith('http') and '/' not in potential_speaker):
+                speaker = potential_speaker
+                title = potential_title
+
+    # Clean title: Remove speaker name from title if title starts with "Name: Rest of title"
+    # This fixes duplication where both Speaker and Title contain the name
+    if speaker and ':' in str(title):
+        # Extract just the name part (before comma in "Name, Institution")
+        speaker_name = speaker.split(',')[0].strip()
+        title_str = str(title).strip()
+
+        # Check if title starts with speaker name followed by colon
+        if title_str.startswith(speaker_name + ':'):
+            # Remove "Name: " prefix from title
+            title = title_str[len(speaker_name) + 1:].strip()
+
+    return title, speaker
+
+
+def filter_seminars(df, current_time=None, speaker_cache=None, stats=None, stage_done=None,
+                    tags=(WEBSITE_TAG,), window=None):
+    """Select upcoming events carrying any of tags within the date window from an export DataFrame
+    The window is (first date, last date), by default this week's. Tag match, date parsing,
+    window, past-date cutoff and start-time cutoff run as whole-column operations; only the
+    surviving rows get speaker extraction (through speaker_cache when given) and the
+    per-event title heuristics. Frames from the event store carry both already (Display
+    title / Display speaker, see normalize_rows) and skip them.
+    Returns a list of output row dicts in source order; 'Expires' (EXPIRY_FORMAT) is when
+    the event should leave the display, 'Tags' the matching tags, 'Id' the event's Id
+    (None without an Id column) and 'Ends' when it ends (EXPIRY_FORMAT, None without an
+    End time), none of them part of the CSV. Counters are added to the
+    stats dict when one is given; stage_done(name, rows_in, rows_out) is called as the
+    'filter' and 'speakers' stages end.
+    """
+    if stats is None:
+        stats = {}
+    if current_time is None:
+        current_time = datetime.now()
+
+    # Detect format (ProjectPlace export vs simple format)
+    is_projectplace_format = 'Start date' in df.columns and 'Start time' in df.columns
+
+    def column(name, default=''):
+        if name in df.columns:
+            return df[name]
+        return pd.Series(default, index=df.index, dtype=object)
+
+    # Check for the tags (e.g. "website")
+    tag_text = column('Tag(s)').map(str).str.lower()
+    tag_hits = pd.DataFrame({tag: tag_text.str.contains(tag, regex=False, na=False) for tag in tags},
+                            index=df.index, dtype=bool)
+    candidates = df.index[tag_hits.any(axis=1).to_numpy(dtype=bool)]
+
+    # Parse dates and keep the window's events that are not in the past
+    if window is None:
+        window = (max(get_current_week_start(current_time.date()), current_time.date()),
+                  get_current_week_end(current_time.date()))
+    date_values = column('Start date' if is_projectplace_format else 'Date', None).loc[candidates]
+    seminar_dates, fallback_cells = parse_date_column(date_values)
+    stats['date_fallback_cells'] = stats.get('date_fallback_cells', 0) + fallback_cells
+    window_start = max(window[0], current_time.date())
+    in_window = ((seminar_dates >= pd.Timestamp(window_start)) &
+                 (seminar_dates <= pd.Timestamp(window[1])))
+    seminar_dates = seminar_dates[in_window]
+    candidates = seminar_dates.index
+
+    # Parse time based on format
+    if is_projectplace_format:
+        time_values = convert_timedelta_column(df.loc[candidates, 'Start time'])
+    else:
+        time_values = column('Time').loc[candidates].map(str).astype(object)
+
+    # Skip events that already started today (unparseable times never skip the event)
+    has_time = time_values.notna() & time_values.astype(bool)
+    has_time &= time_values.astype(str).str.lower() != 'nan'
+    timed = time_values[has_time].astype(str)
+    start_strings = timed.where(~timed.str.contains('-', regex=False),
+                                timed.str.split('-').str[0].str.strip())
+    start_times = pd.to_datetime(start_strings, format='%H:%M', errors='coerce')
+    event_datetimes = seminar_dates[start_times.index] + (start_times - start_times.dt.normalize())
+    started = event_datetimes[event_datetimes < current_time].index
+    keep = candidates.difference(started, sort=False)
+
+    # Events drop off the display when they start; untimed events at the end of their day
+    expires = seminar_dates + pd.Timedelta(days=1)
+    timed_events = event_datetimes.dropna()
+    expires.loc[timed_events.index] = timed_events
+    expires = expires.dt.strftime(EXPIRY_FORMAT)
+
+    iso_dates = seminar_dates.dt.strftime('%Y-%m-%d')
+    formatted_dates = seminar_dates.dt.strftime('%A %d %b').str.capitalize()
+    if stage_done is not None:
+        stage_done('filter', len(df), len(keep))
+
+    # Extract speaker, then split "Name: Title" titles (done at ingest for event store frames)
+    titles = column('Title').loc[keep]
+    if 'Display title' in df.columns:
+        display = zip(df.loc[keep, 'Display title'], df.loc[keep, 'Display speaker'])
+        stats['speakers_extracted'] = 0
+    else:
+        if is_projectplace_format:
+            speakers, stats['speakers_extracted'] = description_speakers(df, keep, speaker_cache)
+        else:
+            speakers = column('Speaker').loc[keep]
+        display = (split_speaker_from_title(title, speaker) for title, speaker in zip(titles, speakers))
+
+    # Get location
+    locations = column('Room location' if is_projectplace_format else 'Location').loc[keep]
+    matched_tags = [[tag for tag, hit in zip(tags, hits) if hit]
+                    for hits in tag_hits.loc[keep].itertuples(index=False, name=None)]
+
+    # Simple-format Time ranges ("HH:MM-HH:MM") carry their own end
+    if is_projectplace_format:
+        ends = event_ends(seminar_dates.loc[keep], column('End date', None).loc[keep],
+                          column('End time', None).loc[keep])
+    else:
+        ends = pd.Series(None, index=keep, dtype=object)
+
+    filtered_rows = []
+    event_ids = column('Id', None).loc[keep]
+    for original_title, (title, speaker), iso_date, formatted_date, time_value, location, expiry, event_tags, event_id, end in zip(
+            titles, display, iso_dates.loc[keep], formatted_dates.loc[keep], time_values.loc[keep], locations,
+            expires.loc[keep], matched_tags, event_ids, ends):
+        filtered_rows.append({
+            'Title_Original': original_title,
+            'Title': title,
+            'Speaker': speaker,
+            'Date': iso_date,
+            'Date_Formatted': formatted_date,
+            'Time': time_value if time_value else '',
+            'Location': location,
+            'Expires': expiry,
+            'Tags': event_tags,
+            'Id': cell_value(event_id),
+            'Ends': end,
+        })
+
+    if stage_done is not None:
+        stage_done('speakers', len(keep), len(filtered_rows))
+    return filtered_rows
+
+
+def event_ends(start_dates, end_dates, end_times):
+    """When events end (EXPIRY_FORMAT): End time on their End date, or on their start date
+    when the End date is missing or earlier. None where End time is missing or no time.
+    """
+    times = convert_timedelta_column(end_times)
+    valid = times.map(lambda value: isinstance(value, str) and TIME_OF_DAY.fullmatch(value) is not None)
+    days, _ = parse_date_column(end_dates)
+    days = days.where(days.notna() & (days >= start_dates), start_dates)
+    ends = days.dt.strftime('%Y-%m-%d') + 'T' + times[valid].str.zfill(5)
+    return ends.astype(object).where(valid, None)
+
+
+def description_speakers(df, rows, speaker_cache=None):
+    """Speakers of the given rows of an export-shaped DataFrame
+    Extracted from Description (through speaker_cache when given); rows whose description
+    names none keep their Speaker cell (simple-format events in the event store).
+    Returns (speakers, number of descriptions extracted).
+    """
+    descriptions = df['Description'].loc[rows] if 'Description' in df.columns else \
+        pd.Series('', index=rows, dtype=object)
+    if speaker_cache is not None and 'Id' in df.columns:
+        speakers, extracted = speaker_cache.extract(df.loc[rows, 'Id'], descriptions)
+    else:
+        speakers, extracted = extract_speakers(descriptions), len(descriptions)
+
+    if 'Speaker' in df.columns:
+        given = df.loc[rows, 'Speaker']
+        speakers = speakers.where((speakers != '') | given.isna(), given)
+    return speakers, extracted
+
+
+def pick_sheet_name(sheet_names):
+    """Find correct sheet"""
+    for name in SHEET_NAMES:
+        if name in sheet_names:
+            return name
+    return sheet_names[0]
+
+
+def read_excel_sheet(excel_file):
+    """Read the seminar sheet of an Excel file into a DataFrame (all rows and columns)"""
+    xls = pd.ExcelFile(excel_file)
+    df = pd.read_excel(xls, sheet_name=pick_sheet_name(xls.sheet_names))
+    df.attrs['source_rows'] = len(df)
+    return df
+
+
+def stream_excel_sheet(excel_file, columns=PIPELINE_COLUMNS):
+    """Stream the seminar sheet in openpyxl read-only mode
+    The sheet is picked and read in one pass over the workbook, and only the given columns
+    are kept. Rows are not filtered by tag, since the event store answers /api/events for
+    any tag. The number of non-blank source rows is kept in df.attrs['source_rows'].
+    """
+    workbook = openpyxl.load_workbook(excel_file, read_only=True, data_only=True)
+    try:
+        rows = workbook[pick_sheet_name(workbook.sheetnames)].iter_rows(values_only=True)
+        header = next(rows, None) or ()
+
+        positions = {}
+        for pos, name in enumerate(header):
+            if name in columns and name not in positions:
+                positions[name] = pos
+
+        records = []
+        source_rows = 0
+        for values in rows:
+            if all(value is None for value in values):
+                continue
+            source_rows += 1
+            records.append([values[pos] if pos < len(values) else None for pos in positions.values()])
+    finally:
+        workbook.close()
+
+    df = pd.DataFrame.from_records(records, columns=list(positions))
+    df.attrs['source_rows'] = source_rows
+    return df
+
+
+def peak_memory_mb():
+    """Peak resident memory of this process in MB (None where not available)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in KB on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def ingest_workbook(excel_file, columns=PIPELINE_COLUMNS):
+    """Parse an export workbook for the event store, logging rows kept and peak memory
+    Uses the streaming reader; files openpyxl cannot open (e.g. legacy .xls) go through pandas.
+    """
+    try:
+        df = stream_excel_sheet(excel_file, columns)
+    except (InvalidFileException, zipfile.BadZipFile):
+        if hasattr(excel_file, 'seek'):
+            excel_file.seek(0)
+        df = read_excel_sheet(excel_file)
+
+    peak = peak_memory_mb()
+    logger.info(f"Ingested {len(df)} of {df.attrs['source_rows']} rows, {len(df.columns)} columns"
+                + (f" (peak memory {peak:.1f} MB)" if peak is not None else ""))
+    return df
+
+
+def cell_text(value):
+    """Cell as stripped text ('' for empty cells)"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ''
+    return str(value).strip()
+
+
+def cell_value(value):
+    """Cell as stored in the event store: text, or None for empty cells"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def store_rows(df, stats=None):
+    """Rows of an export DataFrame as EventStore rows (STORE_FIELDS order)
+    Dates are parsed here, once per upload, into ISO dates; ProjectPlace times become
+    'HH:MM' and the simple format keeps its Time text. Rows without an Id are keyed by a
+    hash of their content. date_fallback_cells is counted in the stats dict when given.
+    """
+    is_projectplace_format = 'Start date' in df.columns and 'Start time' in df.columns
+
+    def column(name, default=None):
+        if name in df.columns:
+            return df[name]
+        return pd.Series(default, index=df.index, dtype=object)
+
+    dates, fallback_cells = parse_date_column(column('Start date' if is_projectplace_format else 'Date'))
+    end_dates, _ = parse_date_column(column('End date'))
+    if stats is not None:
+        stats['date_fallback_cells'] = stats.get('date_fallback_cells', 0) + fallback_cells
+
+    if is_projectplace_format:
+        start_times = convert_timedelta_column(column('Start time'))
+        end_times = convert_timedelta_column(column('End time'))
+        locations = column('Room location')
+    else:
+        start_times = column('Time')
+        end_times = column('End time')
+        locations = column('Location')
+
+    rows = []
+    for values in zip(column('Id'), column('Title'), column('Description'), column('Speaker'), column('Tag(s)'),
+                      locations, dates.dt.strftime('%Y-%m-%d'), start_times, end_dates.dt.strftime('%Y-%m-%d'),
+                      end_times):
+        row = [cell_value(value) for value in values]
+        if row[0] is None:
+            content = '\x1f'.join(value or '' for value in row[1:])
+            row[0] = 'sha1:' + hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+        rows.append(tuple(row))
+    return rows
+
+
+def normalize_rows(rows):
+    """Display (title, speaker) for EventStore rows, as filter_seminars would derive them
+    The speaker comes from the description (or the Speaker cell when it names none), then
+    split_speaker_from_title applies the "Name: Title" and prefix heuristics.
+    """
+    df = store_frame(rows)
+    speakers, _ = description_speakers(df, df.index)
+    return [split_speaker_from_title(title, speaker) for title, speaker in zip(df['Title'], speakers)]
+
+
+def store_frame(rows):
+    """EventStore rows as an export-shaped DataFrame (ProjectPlace columns, see STORE_COLUMNS)
+    Rows from EventStore.query() also fill Display title and Display speaker.
+    """
+    fields = STORE_FIELDS + NORMALIZED_FIELDS if rows and len(rows[0]) > len(STORE_FIELDS) else STORE_FIELDS
+    df = pd.DataFrame.from_records(rows, columns=list(fields)).rename(columns=STORE_COLUMNS)
+    df['Start date'] = pd.to_datetime(df['Start date'])
+    df['End date'] = pd.to_datetime(df['End date'])
+    return df
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+CSV, JSON and ICS renditions of a display's seminars, precompressed
+Every format is built from the rows of the display's CSV view in one go, along with its
+gzip and brotli bodies, so requests only pick the bytes matching their Accept-Encoding.
+"""
+
+import csv
+import gzip
+import hashlib
+import io
+import json
+import re
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+import brotli
+
+from display_week import EXPIRY_FORMAT
+
+# Served formats: extension -> mimetype
+FORMATS = {
+    'csv': 'text/csv',
+    'json': 'application/json',
+    'ics': 'text/calendar',
+}
+# Content codings in order of preference
+ENCODINGS = ('br', 'gzip')
+GZIP_LEVEL = 9
+# Brotli's densest setting (11) takes ~50x longer for bodies only about a tenth smaller
+BROTLI_QUALITY = 9
+
+# Length of calendar entries for seminars with no end time (Time range or End time)
+ICS_DEFAULT_DURATION = timedelta(hours=1)
+ICS_LINE_OCTETS = 75
+TIME_RANGE = re.compile(r'(\d{1,2}):(\d{2})(?:\s*-\s*(\d{1,2}):(\d{2}))?')
+
+# bodies: {content coding ('identity', 'gzip', 'br'): bytes}
+Rendition = namedtuple('Rendition', ['mimetype', 'etag', 'last_modified', 'bodies'])
+
+
+def csv_rows(body):
+    """Rows of CSV bytes as dicts by column (quoted multi-line fields included)"""
+    return list(csv.DictReader(io.StringIO(body.decode('utf-8'))))
+
+
+def render_json(rows):
+    """JSON document {"seminars": [...]} with each row's columns as snake_case keys"""
+    seminars = [{column.lower(): value for column, value in row.items()} for row in rows]
+    return json.dumps({'seminars': seminars}, ensure_ascii=False).encode('utf-8')
+
+
+def ics_text(value):
+    """Escape a value for an iCalendar TEXT property"""
+    return (value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def ics_fold(line):
+    """Fold a content line at ICS_LINE_OCTETS octets without splitting a character"""
+    if len(line.encode('utf-8')) <= ICS_LINE_OCTETS:
+        return line
+    parts = []
+    start = 0
+    octets = 0
+    limit = ICS_LINE_OCTETS
+    for position, char in enumerate(line):
+        size = len(char.encode('utf-8'))
+        if octets + size > limit:
+            parts.append(line[start:position])
+            start, octets = position, 0
+            limit = ICS_LINE_OCTETS - 1
+        octets += size
+    parts.append(line[start:])
+    return '\r\n '.join(parts)
+
+
+def ics_times(row, tz, end=None):
+    """DTSTART/DTEND properties for a row: UTC times from Date and Time ("HH:MM" or
+    "HH:MM-HH:MM"), or an all-day date when it has no time
+    end is the event's end from the store (EXPIRY_FORMAT) for times that give none;
+    without either the event lasts ICS_DEFAULT_DURATION.
+    """
+    day = datetime.strptime(row['Date'], '%Y-%m-%d')
+    match = TIME_RANGE.match(row.get('Time') or '')
+    if match is None:
+        return [f"DTSTART;VALUE=DATE:{day:%Y%m%d}", f"DTEND;VALUE=DATE:{day + timedelta(days=1):%Y%m%d}"]
+
+    start_hour, start_minute, end_hour, end_minute = match.groups()
+    start = tz.localize(day.replace(hour=int(start_hour), minute=int(start_minute)))
+    if end_hour is not None:
+        end = tz.localize(day.replace(hour=int(end_hour), minute=int(end_minute)))
+    elif end is not None:
+        end = tz.localize(datetime.strptime(end, EXPIRY_FORMAT))
+    if end is None or end <= start:
+        end = start + ICS_DEFAULT_DURATION
+    return [f"DTSTART:{start.astimezone(timezone.utc):%Y%m%dT%H%M%SZ}",
+            f"DTEND:{end.astimezone(timezone.utc):%Y%m%dT%H%M%SZ}"]
+
+
+def render_ics(rows, tz, stamp, events=None):
+    """iCalendar feed of the rows; times are read in tz (a pytz zone), stamp is DTSTAMP
+    events are the rows' (event Id, end) pairs in row order. UIDs are the Ids, so calendar
+    apps update an event whose time or title changed instead of adding it again. Rows
+    without an Id (generations published before Ids were kept) get a hash of their date,
+    time, title and location.
+    """
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//Institut Mittag-Leffler//SmartSign//EN',
+             'CALSCALE:GREGORIAN', 'METHOD:PUBLISH', 'X-WR-CALNAME:IML Seminars']
+    dtstamp = stamp.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    for row, (event_id, end) in zip(rows, events or [(None, None)] * len(rows)):
+        if event_id is None:
+            key = '\x1f'.join(row.get(column) or '' for column in ('Date', 'Time', 'Title', 'Location'))
+            event_id = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        lines.append('BEGIN:VEVENT')
+        lines.append(f"UID:{ics_text(event_id)}@smartsign")
+        lines.append(f"DTSTAMP:{dtstamp}")
+        lines.extend(ics_times(row, tz, end))
+        lines.append(f"SUMMARY:{ics_text(row.get('Title') or '')}")
+        if row.get('Speaker'):
+            lines.append(f"DESCRIPTION:{ics_text('Speaker: ' + row['Speaker'])}")
+        if row.get('Location'):
+            lines.append(f"LOCATION:{ics_text(row['Location'])}")
+        lines.append('END:VEVENT')
+    lines.append('END:VCALENDAR')
+    return ('\r\n'.join(ics_fold(line) for line in lines) + '\r\n').encode('utf-8')
+
+
+def compress(body):
+    """{content coding: bytes} for body: identity, gzip and br"""
+    return {
+        'identity': body,
+        'gzip': gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0),
+        'br': brotli.compress(body, quality=BROTLI_QUALITY),
+    }
+
+
+def build_renditions(view, tz):
+    """Every format of a display view (a Snapshot-like with body, etag, last_modified and events)
+    Returns {extension: Rendition}. The CSV keeps the view's ETag, so existing clients'
+    validators stay valid.
+    """
+    rows = csv_rows(view.body)
+    bodies = {
+        'csv': view.body,
+        'json': render_json(rows),
+        'ics': render_ics(rows, tz, view.last_modified, view.events),
+    }
+    renditions = {}
+    for extension, body in bodies.items():
+        etag = view.etag if extension == 'csv' else hashlib.sha256(body).hexdigest()[:32]
+        renditions[extension] = Rendition(FORMATS[extension], etag, view.last_modified, compress(body))
+    return renditions
+
+
+def pick_encoding(rendition, accept_encodings):
+    """Content coding to send: the preferred one of ENCODINGS the client accepts (werkzeug
+    Accept object) and the rendition has, else 'identity'"""
+    for coding in ENCODINGS:
+        if coding in rendition.bodies and accept_encodings[coding] > 0:
+            return coding
+    return 'identity'
@@ -7,17 +7,41 @@ Optimized for Railway deployment with automatic daily filtering
 """
 
 import os
+import html
 import json
 import re
+import time
+import uuid
+import hashlib
+import bisect
+import threading
+import tempfile
+import csv
+import io
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from datetime import datetime, timedelta
-from flask import Flask, send_file, send_from_directory, request, jsonify
-import pandas as pd
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
-import pytz
+from datetime import date, datetime, timedelta, timezone
+from flask import Flask, Request, Response, g, send_file, send_from_directory, request, jsonify, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
 import logging
 
+# pandas, openpyxl (pipeline.py) and APScheduler are imported where a pipeline run or the
+# scheduler needs them, so workers that only serve displays start without them
+from access_log import AccessLog
+from display_week import EXPIRY_FORMAT, WEBSITE_TAG, get_current_week_start, get_current_week_end
+from event_index import EventIndex, DEFAULT_LIMIT, MAX_LIMIT
+from event_store import EventStore, split_tags
+from metrics import Metrics, REQUEST_BUCKETS, STAGE_BUCKETS, process_alive
+from renditions import FORMATS, build_renditions, csv_rows, pick_encoding
+from static_assets import StaticAssets
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
 # Configure logging first
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -25,6 +49,10 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 BASE_DIR = Path(__file__).parent
 
+# JSON access log written off the request thread (display polls and images are sampled)
+access_log = AccessLog()
+access_log.init_app(app)
+
 # Use persistent volume for Excel storage (survives deployments)
 # Railway volume should be mounted at /data
 STORAGE_DIR = Path(os.environ.get('STORAGE_PATH', '/data'))
@@ -37,263 +65,1167 @@ else:
 
 EXCEL_STORAGE = STORAGE_DIR / 'latest_export.xlsx'
 
+# Uploads are streamed to a temp file in STORAGE_DIR and renamed into place
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # 10MB
+# Whole request body limit (upload plus multipart overhead), checked before reading
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_SIZE + 64 * 1024
 
-def get_current_week_start():
-    """Get Monday of week to display
-    - Mon-Thu: current week
-    - Fri-Sun: next week
+
+class UploadSpool:
+    """Writable stream for an incoming upload
+    Chunks go straight to a temp file in STORAGE_DIR; the size limit is enforced and
+    the SHA-256 computed as they arrive, so memory use does not depend on file size.
     """
-    today = datetime.now()
-    monday = today - timedelta(days=today.weekday())
-    # If Friday or later, show next week
-    if today.weekday() >= 4:
-        monday = monday + timedelta(days=7)
-    return monday.date()
 
+    def __init__(self, directory):
+        fd, path = tempfile.mkstemp(prefix='.upload-', suffix='.tmp', dir=directory)
+        self.file = os.fdopen(fd, 'w+b')
+        self.path = Path(path)
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > MAX_UPLOAD_SIZE:
+            raise RequestEntityTooLarge()
+        self.sha256.update(data)
+        return self.file.write(data)
+
+    def save_as(self, target):
+        """Flush the upload to disk and rename it to target"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        os.replace(self.path, target)
+
+    def discard(self):
+        """Close and delete the temp file (no-op once saved)"""
+        self.file.close()
+        self.path.unlink(missing_ok=True)
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+
+class UploadRequest(Request):
+    """Request that spools file uploads with UploadSpool instead of werkzeug's temp files"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        spool = UploadSpool(STORAGE_DIR)
+        self.environ.setdefault('smartsign.upload_spools', []).append(spool)
+        return spool
+
+
+app.request_class = UploadRequest
+
+# Every uploaded event, upserted by Id; the source of truth for the pipeline and /api/events
+# (EXCEL_STORAGE only keeps the last upload, and seeds an empty store on first start)
+EVENT_STORE = STORAGE_DIR / 'events.db'
+event_store = EventStore(EVENT_STORE)
+
+# Cross-process locks: one pipeline run at a time, one upload accepted at a time, one
+# scheduler per host
+PIPELINE_LOCK = STORAGE_DIR / 'pipeline.lock'
+UPLOAD_LOCK = STORAGE_DIR / 'upload.lock'
+SCHEDULER_LOCK = STORAGE_DIR / 'scheduler.lock'
+_pipeline_lock = threading.Lock()
+_upload_lock = threading.Lock()
+_scheduler_leader = {'lock_file': None, 'scheduler': None}
+
+# Result of the most recent pipeline run, shared with syncs that queued up behind it
+LAST_RUN = STORAGE_DIR / 'last_run.json'
+# SHA-256 and mode of the most recent upload whose events were committed, with its job
+# (identical re-uploads get that job, see upload_job)
+LAST_UPLOAD = STORAGE_DIR / 'last_upload.json'
+
+# Background pipeline jobs (uploads); job records are JSON files so any worker can report them
+# (each records the run and process whose executor holds it, see job_lost)
+JOBS_DIR = STORAGE_DIR / 'jobs'
+# Each queued upload's own file (by job id), so later uploads can't replace it before its
+# job reads it; kept as EXCEL_STORAGE once its events are in the store, else deleted
+UPLOADS_DIR = STORAGE_DIR / 'uploads'
+JOB_RETENTION = 24 * 3600
+MAX_PENDING_JOBS = 4
+PIPELINE_STAGES = ['ingest', 'read', 'filter', 'speakers', 'render', 'publish']
+_job_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pipeline-job')
+_job_slots = threading.BoundedSemaphore(MAX_PENDING_JOBS)
+
+# Prometheus metrics (see /metrics); each worker flushes its samples to METRICS_DIR
+# METRICS_DIR is a temp directory per server run (gunicorn.conf.py gives all workers one
+# SMARTSIGN_RUN_ID), so a new process that reuses the PID of one from an earlier run never
+# has that run's counters merged in. A METRICS_DIR set in the environment must be
+# emptied before each run.
+RUN_ID = os.environ.get('SMARTSIGN_RUN_ID') or uuid.uuid4().hex
+METRICS_DIR = Path(os.environ.get('METRICS_DIR') or Path(tempfile.gettempdir()) / f'smartsign-metrics-{RUN_ID}')
+metrics = Metrics(METRICS_DIR)
+metrics.histogram('smartsign_http_request_duration_seconds',
+                  'Time to build a response, by route, method and status', REQUEST_BUCKETS)
+metrics.histogram('smartsign_pipeline_stage_duration_seconds', 'Pipeline stage run time', STAGE_BUCKETS)
+metrics.counter('smartsign_pipeline_stage_rows_in_total', 'Rows going into each pipeline stage')
+metrics.counter('smartsign_pipeline_stage_rows_out_total', 'Rows coming out of each pipeline stage')
+metrics.gauge('smartsign_pipeline_last_stage_duration_seconds', 'Stage run time in the most recent pipeline run')
+metrics.gauge('smartsign_pipeline_last_stage_rows', 'Rows in and out of each stage in the most recent pipeline run')
+metrics.counter('smartsign_pipeline_runs_total', 'Pipeline runs by result')
+metrics.counter('smartsign_pipeline_shared_runs_total', 'Rebuild requests answered by a run that was already under way')
+metrics.counter('smartsign_uploads_deduplicated_total', 'Uploads identical to the previous one, answered with its job')
+metrics.counter('smartsign_event_streams_refused_total', 'Live update streams turned away (EVENTS_MAX_STREAMS)')
+metrics.gauge('smartsign_pipeline_last_success_timestamp_seconds', 'Unix time of the last successful pipeline run')
+
+# Logo and background, read once and served from memory under content-hashed /assets/
+# URLs; resized variants are kept in ASSET_CACHE so workers and restarts reuse them
+ASSET_CACHE = STORAGE_DIR / 'assets'
+ASSET_MAX_AGE = 365 * 24 * 3600
+assets = StaticAssets(BASE_DIR / 'static', cache_dir=ASSET_CACHE)
+# Display page: the template with asset references pointing at the hashed URLs (by
+# display width class), and with the display's seminars rendered in (by display and
+# width class, per view)
+DISPLAY_TEMPLATE = BASE_DIR / 'template_simple.html'
+MAX_DISPLAY_WIDTH = 7680
+SEMINARS_START = '<!-- seminars:start -->'
+SEMINARS_END = '<!-- seminars:end -->'
+_display_templates = {}
+_display_pages = {}
+
+# Every dated event of the event store, whatever its tags, indexed for /api/events
+# The index is rebuilt when the store revision changes.
+_event_index = {'index': None, 'checked_at': 0.0}
+_event_index_lock = threading.Lock()
+# Seconds /api/events asks clients to wait while a stored workbook is being loaded
+EVENTS_LOADING_RETRY = 10
+# Event fields returned by /api/events
+EVENT_FIELDS = ['id', 'title', 'speaker', 'date', 'start_time', 'end_date', 'end_time', 'location', 'tags']
+
+# Published display data, served from memory (see publish_snapshot)
+# Every publish is an immutable generation file in PUBLISH_DIR; CURRENT_POINTER names the
+# live one and CSV_PATH mirrors it for tools that read the file directly.
+CSV_PATH = BASE_DIR / 'seminarier.csv'
+PUBLISH_DIR = STORAGE_DIR / 'published'
+CURRENT_POINTER = PUBLISH_DIR / 'CURRENT'
+PUBLISH_KEEP_GENERATIONS = 10
+# How often (seconds) a worker checks for a snapshot published by another process
+SNAPSHOT_CHECK_INTERVAL = 2.0
+
+# index: {'header_end': byte offset, 'expires': [...], 'offsets': [...]} for published
+# generations whose rows are sorted by expiry (see render_csv); None for plain files
+# events: (event Id, end) of a view's rows in body order, for the calendar feed (see
+# view_events; None when the generation has no Ids)
+Snapshot = namedtuple('Snapshot', ['body', 'etag', 'last_modified', 'generation', 'source_key', 'index', 'events'],
+                      defaults=(None,))
+_snapshot = {'current': None, 'checked_at': 0.0}
+# Upcoming-events view of the current snapshot, recomputed at most once per minute
+_view = {'key': None, 'view': None}
+
+# Named display profiles (DISPLAYS_CONFIG). Each display is a view of the one published
+# event table, picked by tag, location and date window; the default display is served
+# at /seminarier.csv and mirrored to CSV_PATH.
+DISPLAYS_CONFIG = Path(os.environ.get('DISPLAYS_CONFIG', BASE_DIR / 'displays.json'))
+DEFAULT_DISPLAY = 'default'
+DisplayProfile = namedtuple('DisplayProfile', ['name', 'tags', 'locations', 'days'])
+_displays = {'key': None, 'profiles': None, 'checked_at': 0.0}
+# Display views by display name: (key, view), recomputed at most once per minute
+_display_views = {}
+# CSV/JSON/ICS renditions of each display's view (see renditions.py), by display name
+# ICS times are local to DISPLAY_TIMEZONE (a pytz zone name)
+DISPLAY_TIMEZONE = 'Europe/Stockholm'
+_display_renditions = {}
+# Notified whenever this process publishes a snapshot (wakes /events streams)
+_snapshot_published = threading.Condition()
+
+# Server-Sent Events: keepalive interval and maximum stream lifetime (clients reconnect)
+EVENTS_KEEPALIVE = 25
+EVENTS_MAX_DURATION = 300
+EVENTS_RETRY_MS = 5000
+# Open streams per process: each holds a worker thread, so keep this well below the
+# thread count (gunicorn.conf.py) to leave threads for uploads, syncs and /metrics.
+# Displays turned away get a 503 and poll instead.
+EVENTS_MAX_STREAMS = int(os.environ.get('EVENTS_MAX_STREAMS', 8))
+EVENTS_REFUSED_RETRY = 300
+_event_streams = threading.BoundedSemaphore(EVENTS_MAX_STREAMS)
+
+
+def ingest_into_store(excel_file, replace=False, stats=None):
+    """Parse a workbook and upsert its events into the event store
+    Returns (non-blank source rows, rows ingested, change counts from EventStore.ingest);
+    an empty workbook leaves the store alone and returns None for the counts.
+    """
+    import pipeline
+    df = pipeline.ingest_workbook(excel_file)
+    source_rows = df.attrs.get('source_rows', len(df))
+    if not source_rows:
+        return 0, 0, None
 
-def get_current_week_end():
-    """Get Friday of week to display"""
-    start = get_current_week_start()
-    return start + timedelta(days=4)
+    rows = pipeline.store_rows(df, stats)
+    changes = event_store.ingest(rows, normalize_rows, replace=replace)
+    logger.info(f"Event store: {changes['added']} added, {changes['changed']} changed, "
+                f"{changes['removed']} removed, {changes['reused']} reused")
+    return source_rows, len(rows), changes
 
 
-def parse_date(date_value):
-    """Parse date from various formats"""
-    if pd.isna(date_value):
-        return None
+def normalize_rows(rows):
+    """pipeline.normalize_rows, importing the pipeline only once there are rows to normalize"""
+    import pipeline
+    return pipeline.normalize_rows(rows)
+
+
+def prepare_event_store():
+    """Bring the event store up to date with this version
+    An empty store is filled from EXCEL_STORAGE, and events stored before fingerprints
+    are normalized. Call under pipeline_lock(). Returns whether the store has events.
+    """
+    if event_store.revision() == 0 and EXCEL_STORAGE.exists():
+        logger.info(f"Seeding event store from {EXCEL_STORAGE}")
+        ingest_into_store(EXCEL_STORAGE, replace=True)
+    normalized = event_store.normalize_missing(normalize_rows)
+    if normalized:
+        logger.info(f"Normalized {normalized} stored events")
+    return event_store.revision() > 0
+
+
+def event_records(rows):
+    """Every dated event of EventStore.query() rows as a dict for EventIndex
+    Titles and speakers are the normalized ones shown on the displays. Simple-format
+    "HH:MM-HH:MM" times are split into start and end.
+    """
+    events = []
+    for row, (event_id, _, _, _, tags, location, day, start_time, end_day, end_time,
+              display_title, display_speaker) in enumerate(rows):
+        if day is None:
+            continue
+        if end_day is None or end_day < day:
+            end_day = day
+        start_time, end_time = (start_time or '').strip(), (end_time or '').strip()
+        if '-' in start_time and not end_time:
+            start_time, end_time = (part.strip() for part in start_time.split('-', 1))
+        events.append({
+            'row': row,
+            'id': (event_id or '').strip() or None,
+            'title': (display_title or '').strip(),
+            'speaker': (display_speaker or '').strip(),
+            'date': day,
+            'start_time': start_time,
+            'end_date': end_day,
+            'end_time': end_time,
+            'location': (location or '').strip(),
+            'tags': split_tags(tags),
+        })
+    return events
+
+
+def get_event_index():
+    """The EventIndex of the event store (None when the store was never filled)
+    The store revision is checked at most every SNAPSHOT_CHECK_INTERVAL seconds; a new
+    revision is indexed from one read transaction, without pipeline_lock(), so requests
+    never wait for a pipeline run. Seeding the store is left to the pipeline runs.
+    """
+    now = time.monotonic()
+    index = _event_index['index']
+    if index is not None and now - _event_index['checked_at'] < SNAPSHOT_CHECK_INTERVAL:
+        return index
+
+    with _event_index_lock:
+        _event_index['checked_at'] = now
+        index = _event_index['index']
+        if index is not None and index.source_key == event_store.revision():
+            return index
+
+        revision, rows = event_store.query_with_revision()
+        if not revision:
+            _event_index['index'] = None
+            return None
+        index = EventIndex(event_records(rows), source_key=revision)
+        logger.info(f"Indexed {len(index)} events (store revision {revision})")
+
+        _event_index['index'] = index
+        return index
+
 
-    if isinstance(date_value, str):
-        for fmt in ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d']:
+@contextmanager
+def file_lock(path, thread_lock):
+    """Hold thread_lock and, where fcntl exists, an exclusive flock on path (across processes)"""
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
             try:
-                return pd.to_datetime(date_value, format=fmt).date()
-            except:
-                continue
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def pipeline_lock():
+    """Serialize pipeline runs across threads and processes"""
+    return file_lock(PIPELINE_LOCK, _pipeline_lock)
+
+
+def read_json(path):
+    """Parsed JSON file (None when missing or unreadable)"""
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def shared_run(since):
+    """Result of a pipeline run that started at or after since (Unix time), if still current
+    A rebuild requested at since has nothing to add to such a run as long as the event
+    store and the live generation are what that run left behind. Call under pipeline_lock().
+    """
+    last_run = read_json(LAST_RUN)
+    if last_run is None or last_run['started'] < since:
+        return None
+    if last_run['revision'] != event_store.revision() or last_run['source_key'] != list(snapshot_source_key() or []):
+        return None
+    return last_run
+
+
+def process_excel_to_csv(excel_file=None, on_stage=None, stats=None, replace=False, since=None, on_ingest=None):
+    """Process Excel file and generate CSV - supports both simple and ProjectPlace export formats
+    The workbook's events are merged into the event store (replace=True drops stored events
+    it lacks), then the displays are rebuilt from the store; with no excel_file only the
+    rebuild runs. Runs under pipeline_lock(), so upload, sync and the scheduler never
+    publish concurrently.
+    Each of PIPELINE_STAGES is timed and its row counts recorded (log and /metrics), and
+    on_stage(name, seconds, rows_in, rows_out) is called as it completes; run counters
+    (e.g. date_fallback_cells) are added to the stats dict when one is given.
+    on_ingest() is called, still under the lock, once the workbook's events are committed
+    to the store.
+    A rebuild with since (the Unix time it was requested) that waited for a run started
+    after that returns the run's result instead of repeating it, with stats['shared'] set.
+    """
+    stats = {} if stats is None else stats
+    with pipeline_lock():
+        last_run = shared_run(since) if excel_file is None and since is not None else None
+        if last_run is not None:
+            stats.update(last_run['stats'], shared=True)
+            metrics.inc('smartsign_pipeline_shared_runs_total')
+            logger.info(f"Sharing the result of the pipeline run started at {last_run['started']:.3f}")
+            return tuple(last_run['result'])
+
+        started = time.time()
+        success, message, count = run_pipeline(excel_file, on_stage, stats, replace, on_ingest)
+        write_atomic(LAST_RUN, json.dumps({
+            'started': started,
+            'revision': event_store.revision(),
+            'source_key': list(snapshot_source_key() or []),
+            'result': [success, message, count],
+            'stats': stats,
+        }).encode('utf-8'))
+
+    metrics.inc('smartsign_pipeline_runs_total', result='success' if success else 'failure')
+    if success:
+        metrics.set('smartsign_pipeline_last_success_timestamp_seconds', time.time())
+    # Write the samples now so /metrics in any worker reflects this run
+    metrics.flush()
+    return success, message, count
+
+
+def run_pipeline(excel_file, on_stage, stats, replace=False, on_ingest=None):
+    """Ingest, read, filter, render and publish (see process_excel_to_csv)
+    Call under pipeline_lock().
+    """
+    try:
+        import pipeline
+        stage_started = time.perf_counter()
+
+        def stage_done(name, rows_in, rows_out):
+            nonlocal stage_started
+            now = time.perf_counter()
+            record_stage(name, now - stage_started, rows_in, rows_out)
+            if on_stage is not None:
+                on_stage(name, now - stage_started, rows_in, rows_out)
+            stage_started = now
+
+        # Merge the workbook into the event store
+        if excel_file is not None:
+            source_rows, ingested, changes = ingest_into_store(excel_file, replace, stats)
+            stage_done('ingest', source_rows, ingested)
+            if changes is None:
+                return False, "Excel file is empty", 0
+            stats['store'] = changes
+            if on_ingest is not None:
+                on_ingest()
+        if not prepare_event_store():
+            return False, "No events stored. Please upload an Excel file first.", 0
+
+        # Every display is served from one event table covering all their tags and windows
+        profiles = display_profiles()
+        now = datetime.now()
+        tags, window = pipeline_selection(profiles.values(), now.date())
+
+        # One indexed query for the events in that window
+        df = pipeline.store_frame(event_store.query(window[0].isoformat(), window[1].isoformat()))
+        stage_done('read', event_store.count(), len(df))
+
+        # Filter seminars (titles and speakers were normalized at ingest)
+        filtered_rows = pipeline.filter_seminars(df, stats=stats, stage_done=stage_done, tags=tags, window=window)
+
+        # Generate CSV (with the expiry index used to drop events as they start)
+        body, index = render_csv(filtered_rows)
+        stage_done('render', len(filtered_rows), len(index['offsets']))
+
+        # Report what the displays show, not the table they are cut from
+        shown = {name: len(display_rows(index, profile, now)) for name, profile in profiles.items()}
+        stats['displays'] = shown
+        if not any(shown.values()):
+            tag_names = ' or '.join(f"'{tag}'" for tag in profiles[DEFAULT_DISPLAY].tags)
+            return False, f"No seminars found tagged with {tag_names} for this week", 0
+
+        publish_snapshot(body, index)
+        stage_done('publish', len(index['offsets']), len(index['offsets']))
+
+        count = shown[DEFAULT_DISPLAY]
+        message = f"Successfully processed {count} seminars"
+        others = [f"{name}: {rows}" for name, rows in shown.items() if name != DEFAULT_DISPLAY]
+        if others:
+            message += f" ({', '.join(others)} on other displays)"
+        if 'store' in stats:
+            message += (f" ({stats['store']['added']} events added, {stats['store']['changed']} changed,"
+                        f" {stats['store']['removed']} removed, {stats['store']['reused']} reused)")
+        if stats.get('date_fallback_cells'):
+            message += f" ({stats['date_fallback_cells']} date cells needed fallback parsing)"
+        return True, message, count
+
+    except Exception as e:
+        return False, f"Error processing file: {str(e)}", 0
+
+
+def record_stage(name, seconds, rows_in, rows_out):
+    """Log a completed pipeline stage and record it in the stage metrics"""
+    logger.info(f"Pipeline stage {name}: {seconds:.3f}s, {rows_in} rows in, {rows_out} rows out")
+    metrics.observe('smartsign_pipeline_stage_duration_seconds', seconds, stage=name)
+    metrics.inc('smartsign_pipeline_stage_rows_in_total', rows_in, stage=name)
+    metrics.inc('smartsign_pipeline_stage_rows_out_total', rows_out, stage=name)
+    metrics.set('smartsign_pipeline_last_stage_duration_seconds', seconds, stage=name)
+    metrics.set('smartsign_pipeline_last_stage_rows', rows_in, stage=name, direction='in')
+    metrics.set('smartsign_pipeline_last_stage_rows', rows_out, stage=name, direction='out')
+
+
+def write_atomic(path, data):
+    """Write bytes to path through a fsynced temp file and a rename
+    Readers see either the old or the new file, never a partial one.
+    """
+    tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def generation_path(generation):
+    """Path of a published generation file"""
+    return PUBLISH_DIR / f'seminarier.{generation:06d}.csv'
+
+
+def list_generations():
+    """Published generation numbers, oldest first"""
+    generations = []
+    for path in PUBLISH_DIR.glob('seminarier.*.csv'):
         try:
-            return pd.to_datetime(date_value).date()
-        except:
-            return None
-    else:
+            generations.append(int(path.name.split('.')[1]))
+        except ValueError:
+            continue
+    return sorted(generations)
+
+
+def index_path(generation):
+    """Path of a published generation's expiry index"""
+    return PUBLISH_DIR / f'seminarier.{generation:06d}.idx.json'
+
+
+def render_csv(rows):
+    """Render output rows (dicts from pipeline.filter_seminars) to CSV bytes sorted by expiry, plus the row index
+    The index holds each row's expiry and byte offset, so the rows still upcoming at any
+    moment are one contiguous tail of the body (see upcoming_view). It also holds each
+    row's date and the row positions per tag and per location, from which display views
+    pick their rows (see display_rows), and each row's event Id and end (for the calendar
+    feed). Columns are the rows' keys less Expires, Tags, Id and Ends.
+    """
+    rows = sorted(rows, key=lambda row: row['Expires'])
+    columns = [column for column in rows[0] if column not in ('Expires', 'Tags', 'Id', 'Ends')] if rows else []
+
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator='\n')
+    writer.writerow(columns)
+    header = out.getvalue().encode('utf-8')
+    chunks = [header]
+    offsets = []
+    position = len(header)
+    for row in rows:
+        out.seek(0)
+        out.truncate()
+        writer.writerow([csv_cell(row[column]) for column in columns])
+        chunk = out.getvalue().encode('utf-8')
+        offsets.append(position)
+        chunks.append(chunk)
+        position += len(chunk)
+
+    by_tag = {}
+    by_location = {}
+    for position, row in enumerate(rows):
+        for tag in row.get('Tags', []):
+            by_tag.setdefault(tag, []).append(position)
+        by_location.setdefault(location_key(row['Location']), []).append(position)
+
+    return b''.join(chunks), {
+        'header_end': len(header),
+        'expires': [row['Expires'] for row in rows],
+        'offsets': offsets,
+        'dates': [row['Date'] for row in rows],
+        'ids': [row.get('Id') for row in rows],
+        'ends': [row.get('Ends') for row in rows],
+        'by_tag': by_tag,
+        'by_location': by_location,
+    }
+
+
+def csv_cell(value):
+    """Cell as written to the CSV: empty for missing values (None or NaN)"""
+    if value is None or (isinstance(value, float) and value != value):
+        return ''
+    return value
+
+
+def location_key(location):
+    """Normalized location for matching display profiles ('' when missing)"""
+    if location is None or (isinstance(location, float) and location != location):
+        return ''
+    return str(location).strip().lower()
+
+
+def make_snapshot(body, stat, generation, source_key, index=None):
+    """Build an immutable snapshot of published CSV bytes
+    The ETag is a content hash and Last-Modified the file mtime, so every worker that
+    loads the same generation hands out the same validators.
+    """
+    return Snapshot(
+        body=body,
+        etag=hashlib.sha256(body).hexdigest()[:32],
+        last_modified=datetime.fromtimestamp(int(stat.st_mtime), tz=timezone.utc),
+        generation=generation,
+        source_key=source_key,
+        index=index,
+    )
+
+
+def snapshot_source_key():
+    """Cheap (stat-only) key that changes whenever a new snapshot goes live"""
+    for kind, path in (('pointer', CURRENT_POINTER), ('file', CSV_PATH)):
         try:
-            return pd.to_datetime(date_value).date()
-        except:
-            return None
+            stat = path.stat()
+            return kind, stat.st_ino, stat.st_mtime_ns
+        except FileNotFoundError:
+            continue
+    return None
 
 
-def convert_timedelta_to_time_str(td_value):
-    """Convert timedelta seconds to HH:MM format"""
-    if pd.isna(td_value):
-        return None
+def read_current_snapshot():
+    """Load the live snapshot from disk (None if nothing has been published)
+    Follows CURRENT_POINTER to its generation file; before the first publish the
+    committed CSV_PATH is served as generation 0.
+    """
+    # Taken before reading, so a concurrent publish can only cause an extra reload later
+    source_key = snapshot_source_key()
 
     try:
-        # If it's a timedelta object
-        if isinstance(td_value, timedelta):
-            total_seconds = int(td_value.total_seconds())
-            hours = total_seconds // 3600
-            minutes = (total_seconds % 3600) // 60
-            return f"{hours:02d}:{minutes:02d}"
-        # If it's already a string, return as is
-        elif isinstance(td_value, str):
-            return td_value
-        else:
+        generation = int(CURRENT_POINTER.read_text().strip())
+        path = generation_path(generation)
+    except (FileNotFoundError, ValueError):
+        generation, path = 0, CSV_PATH
+
+    try:
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            body = f.read()
+    except FileNotFoundError:
+        return None
+
+    index = None
+    if generation:
+        try:
+            index = json.loads(index_path(generation).read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            index = None
+
+    return make_snapshot(body, stat, generation, source_key, index)
+
+
+def activate_generation(generation):
+    """Make a published generation live in this and (via CURRENT_POINTER) all other processes
+    CSV_PATH gets what the default display shows, for tools that read the file directly.
+    """
+    write_atomic(CURRENT_POINTER, f'{generation}\n'.encode('ascii'))
+
+    snapshot = read_current_snapshot()
+    _snapshot['current'] = snapshot
+    _snapshot['checked_at'] = time.monotonic()
+
+    mirror = snapshot.body
+    if has_display_index(snapshot):
+        mirror = render_display(snapshot, display_profiles()[DEFAULT_DISPLAY], datetime.now()).body
+    write_atomic(CSV_PATH, mirror)
+    with _snapshot_published:
+        _snapshot_published.notify_all()
+
+    # Build every display's renditions now rather than in the first request for them
+    for profile in display_profiles().values():
+        display_renditions(profile)
+    return snapshot
+
+
+def publish_snapshot(body, index=None):
+    """Publish CSV bytes as the next generation and make it the snapshot served to displays
+    Must run under pipeline_lock(). The expiry index (from render_csv) is written before
+    the generation file, so readers never find a generation without it. Only the newest
+    PUBLISH_KEEP_GENERATIONS (plus the live one) are kept.
+    """
+    PUBLISH_DIR.mkdir(parents=True, exist_ok=True)
+    generations = list_generations()
+    generation = (generations[-1] if generations else 0) + 1
+    if index is not None:
+        write_atomic(index_path(generation), json.dumps(index).encode('utf-8'))
+    write_atomic(generation_path(generation), body)
+    snapshot = activate_generation(generation)
+
+    for old_generation in list_generations()[:-PUBLISH_KEEP_GENERATIONS]:
+        if old_generation != snapshot.generation:
+            generation_path(old_generation).unlink(missing_ok=True)
+            index_path(old_generation).unlink(missing_ok=True)
+
+    logger.info(f"Published generation {generation} ({len(body)} bytes)")
+    return snapshot
+
+
+def rollback_snapshot(generation=None):
+    """Make an earlier published generation live again (default: the one before the live one)
+    Returns the new snapshot, or None if there is no such generation.
+    """
+    with pipeline_lock():
+        current = read_current_snapshot()
+        generations = list_generations()
+        if generation is None:
+            live = current.generation if current is not None else 0
+            older = [g for g in generations if g < live]
+            generation = older[-1] if older else None
+        if generation is None or generation not in generations:
             return None
-    except:
+
+        logger.info(f"Rolling back to generation {generation}")
+        return activate_generation(generation)
+
+
+def current_snapshot():
+    """Return the snapshot to serve, picking up snapshots published by other processes
+    The pointer file is only stat'ed every SNAPSHOT_CHECK_INTERVAL seconds and the
+    generation only re-read when the pointer changed. Returns None if nothing is published.
+    """
+    snapshot = _snapshot['current']
+    now = time.monotonic()
+    if snapshot is not None and now - _snapshot['checked_at'] < SNAPSHOT_CHECK_INTERVAL:
+        return snapshot
+    _snapshot['checked_at'] = now
+
+    source_key = snapshot_source_key()
+    if source_key is None:
+        return snapshot
+
+    if snapshot is None or snapshot.source_key != source_key:
+        snapshot = read_current_snapshot() or snapshot
+        _snapshot['current'] = snapshot
+    return snapshot
+
+
+def upcoming_view(now=None):
+    """Return the current snapshot cut down to events that have not started yet
+    Binary-searches the snapshot's expiry index for the current minute and serves the
+    matching tail of the body, so displays stay accurate through the day without a
+    re-run of the pipeline. Views are cached per snapshot and minute. The ETag is the
+    snapshot's plus the cut position, so it only changes when an event drops off.
+    """
+    snapshot = current_snapshot()
+    if snapshot is None or snapshot.index is None:
+        return snapshot
+
+    if now is None:
+        now = datetime.now()
+    minute = now.strftime(EXPIRY_FORMAT)
+    key = (snapshot.source_key, snapshot.etag, minute)
+    if _view['key'] == key:
+        return _view['view']
+
+    index = snapshot.index
+    cut = bisect.bisect_right(index['expires'], minute)
+    if cut == 0:
+        view = snapshot._replace(events=view_events(index, range(len(index['offsets']))))
+    else:
+        start = index['offsets'][cut] if cut < len(index['offsets']) else len(snapshot.body)
+        last_expired = datetime.strptime(index['expires'][cut - 1], EXPIRY_FORMAT).astimezone(timezone.utc)
+        view = snapshot._replace(
+            body=snapshot.body[:index['header_end']] + snapshot.body[start:],
+            etag=f'{snapshot.etag}-{cut}',
+            last_modified=max(snapshot.last_modified, last_expired),
+            index=None,
+            events=view_events(index, range(cut, len(index['offsets']))),
+        )
+
+    _view['key'], _view['view'] = key, view
+    return view
+
+
+def view_events(index, rows):
+    """(event Id, end) of the given index rows (None for generations published without Ids)
+    Generations published before ends were kept give None ends.
+    """
+    if 'ids' not in index:
         return None
+    ends = index.get('ends') or [None] * len(index['ids'])
+    return [(index['ids'][row], ends[row]) for row in rows]
 
 
-def extract_speaker_from_description(desc_html):
-    """Extract speaker from HTML description
-    Supports two formats:
-    1. <b>Speaker</b><br/>Name, Institution<br/>
-    2. <b>Speaker</b><br />\\nName, Institution<br/>
+def parse_display_profile(name, entry):
+    """Build a DisplayProfile from its DISPLAYS_CONFIG entry (ValueError if malformed)
+    window is "week" (the Mon-Fri week from get_current_week_start) or {"days": N} for
+    today and the N-1 days after it; without locations a display shows every location.
     """
-    if not desc_html or pd.isna(desc_html):
-        return ''
+    if not re.fullmatch(r'[a-z0-9][a-z0-9_-]*', name):
+        raise ValueError(f"invalid display name {name!r}")
+    tags = tuple(str(tag).strip().lower() for tag in entry.get('tags', [WEBSITE_TAG]))
+    if not tags or not all(tags):
+        raise ValueError(f"display {name!r} needs at least one non-empty tag")
+    locations = tuple(location_key(location) for location in entry.get('locations', []))
+
+    window = entry.get('window', 'week')
+    if window == 'week':
+        days = None
+    elif isinstance(window, dict) and isinstance(window.get('days'), int) and window['days'] > 0:
+        days = window['days']
+    else:
+        raise ValueError(f'display {name!r}: window must be "week" or {{"days": N}}')
+    return DisplayProfile(name, tags, locations, days)
+
 
+def load_display_profiles(path):
+    """Read display profiles from a JSON file of {name: {tags, locations, window}}
+    Malformed entries are logged and skipped; the default display (website tag, this
+    week, all locations) exists even without a file.
+    """
+    profiles = {}
     try:
-        desc_str = str(desc_html)
-        # Look for <b>Speaker</b> tag
-        if '<b>Speaker</b>' in desc_str:
-            start_idx = desc_str.find('<b>Speaker</b>') + len('<b>Speaker</b>')
-
-            # Skip the first <br> tag (usually right after <b>Speaker</b>)
-            br_idx = desc_str.find('<br', start_idx)
-            if br_idx != -1:
-                # Find the end of this <br> tag
-                br_end = desc_str.find('>', br_idx)
-                if br_end != -1:
-                    start_idx = br_end + 1
-
-            # Now find the next <br> tag (end of speaker line)
-            end_idx = desc_str.find('<br', start_idx)
-            if end_idx == -1:
-                end_idx = start_idx + 200  # Fallback: take next 200 chars
-
-            speaker_text = desc_str[start_idx:end_idx].strip()
-            # Remove all HTML tags (including </p>, <br>, etc)
-            speaker_text = re.sub(r'<[^>]+>', '', speaker_text).strip()
-            # Take only first line (stop at newline before Abstract/etc)
-            speaker_text = speaker_text.split('\n')[0].strip()
-            # Remove extra whitespace/newlines
-            speaker_text = ' '.join(speaker_text.split())
-            return speaker_text if speaker_text else ''
-        else:
-            return ''
-    except:
-        return ''
+        config = json.loads(Path(path).read_text(encoding='utf-8'))
+        if not isinstance(config, dict):
+            raise ValueError("expected an object of display profiles")
+    except FileNotFoundError:
+        config = {}
+    except ValueError as e:
+        logger.error(f"Ignoring display profiles in {path}: {str(e)}")
+        config = {}
+
+    for name, entry in config.items():
+        try:
+            profiles[name] = parse_display_profile(name, entry)
+        except (ValueError, TypeError, AttributeError) as e:
+            logger.error(f"Skipping display profile {name!r}: {str(e)}")
 
+    profiles.setdefault(DEFAULT_DISPLAY, DisplayProfile(DEFAULT_DISPLAY, (WEBSITE_TAG,), (), None))
+    return profiles
+
+
+def display_profiles():
+    """Display profiles by name, re-read when DISPLAYS_CONFIG changes
+    The file is only stat'ed every SNAPSHOT_CHECK_INTERVAL seconds.
+    """
+    now = time.monotonic()
+    if _displays['profiles'] is not None and now - _displays['checked_at'] < SNAPSHOT_CHECK_INTERVAL:
+        return _displays['profiles']
+    _displays['checked_at'] = now
 
-def process_excel_to_csv(excel_file):
-    """Process Excel file and generate CSV - supports both simple and ProjectPlace export formats"""
     try:
-        # Read Excel
-        xls = pd.ExcelFile(excel_file)
-
-        # Find correct sheet
-        sheet_name = None
-        for name in ['Data', 'data', 'Seminars', 'seminars', 'Program', 'program', 'ExportedPrograms']:
-            if name in xls.sheet_names:
-                sheet_name = name
-                break
-
-        if sheet_name is None:
-            sheet_name = xls.sheet_names[0]
-
-        df = pd.read_excel(excel_file, sheet_name=sheet_name)
-
-        if df.empty:
-            return False, "Excel file is empty", 0
-
-        # Detect format (ProjectPlace export vs simple format)
-        is_projectplace_format = 'Start date' in df.columns and 'Start time' in df.columns
-
-        # Filter seminars
-        week_start = get_current_week_start()
-        week_end = get_current_week_end()
-        filtered_rows = []
-        current_time = datetime.now()
-
-        for idx, row in df.iterrows():
-            # Check for "website" tag
-            tags = str(row.get('Tag(s)', '') or '')
-            if 'website' not in tags.lower():
-                continue
-
-            # Parse date based on format
-            if is_projectplace_format:
-                date_value = row.get('Start date', None)
-            else:
-                date_value = row.get('Date', None)
-
-            seminar_date = parse_date(date_value)
-
-            if seminar_date is None:
-                continue
-
-            # Check if this week
-            if not (week_start <= seminar_date <= week_end):
-                continue
-
-            # Skip events from past dates (not today or future)
-            if seminar_date < datetime.now().date():
-                continue
-
-            # Parse time based on format
-            if is_projectplace_format:
-                time_value = convert_timedelta_to_time_str(row.get('Start time', None))
-            else:
-                time_value = str(row.get('Time', ''))
-
-            # Check if future event
-            if time_value and time_value.lower() != 'nan':
-                try:
-                    start_time_str = time_value.split('-')[0].strip() if '-' in time_value else time_value
-                    start_time = pd.to_datetime(start_time_str, format='%H:%M').time()
-                    event_datetime = datetime.combine(seminar_date, start_time)
-                    if event_datetime < current_time:
-                        continue
-                except:
-                    pass  # If time parsing fails, don't skip the event
-
-            # Extract speaker
-            if is_projectplace_format:
-                speaker = extract_speaker_from_description(row.get('Description', ''))
-            else:
-                speaker = row.get('Speaker', '')
-
-            # Get title
-            title = row.get('Title', '')
-
-            # Smart parsing: If speaker is empty but title contains "Name: Title" format, parse it
-            # e.g., "Genming Bai: TBA" → Speaker="Genming Bai", Title="TBA"
-            if (not speaker or str(speaker).strip() == '' or str(speaker).lower() == 'nan') and ':' in str(title):
-                parts = str(title).split(':', 1)
-                if len(parts) == 2:
-                    potential_speaker = parts[0].strip()
-                    potential_title = parts[1].strip()
-
-                    # Only parse if left side looks like a person's name (not a course code or long title)
-                    # Heuristics:
-                    # - Should be relatively short (< 60 chars, typically names are 20-40 chars)
-                    # - Should not contain numbers at the start (like "FSF3571")
-                    # - Should not contain certain course-like keywords ("course", "lecture", "module", "seminar" in the left part)
-                    # - Should not contain slashes or URLs
-                    course_keywords = ['course', 'lecture', 'module', 'seminar', 'workshop', 'session', 'tutorial']
-                    has_course_keyword = any(keyword in potential_speaker.lower() for keyword in course_keywords)
-                    looks_like_code = potential_speaker and potential_speaker[0].isdigit()
-
-                    if (potential_speaker and len(potential_speaker) < 60 and
-                        not has_course_keyword and not looks_like_code and
-                        not potential_speaker.startswith('http') and '/' not in potential_speaker):
-                        speaker = potential_speaker
-                        title = potential_title
-
-            # Clean title: Remove speaker name from title if title starts with "Name: Rest of title"
-            # This fixes duplication where both Speaker and Title contain the name
-            if speaker and ':' in str(title):
-                # Extract just the name part (before comma in "Name, Institution")
-                speaker_name = speaker.split(',')[0].strip()
-                title_str = str(title).strip()
-
-                # Check if title starts with speaker name followed by colon
-                if title_str.startswith(speaker_name + ':'):
-                    # Remove "Name: " prefix from title
-                    title = title_str[len(speaker_name) + 1:].strip()
-
-            # Get location
-            if is_projectplace_format:
-                location = row.get('Room location', '')
-            else:
-                location = row.get('Location', '')
-
-            # Add to results
-            filtered_rows.append({
-                'Title_Original': row.get('Title', ''),
-                'Title': title,
-                'Speaker': speaker,
-                'Date': seminar_date.isoformat(),
-                'Date_Formatted': seminar_date.strftime('%A %d %b').capitalize(),
-                'Time': time_value if time_value else '',
-                'Location': location,
-            })
-
-        if not filtered_rows:
-            return False, "No seminars found tagged with 'website' for this week", 0
-
-        # Generate CSV
-        csv_df = pd.DataFrame(filtered_rows)
-        csv_path = BASE_DIR / 'seminarier.csv'
-        csv_df.to_csv(csv_path, index=False, encoding='utf-8')
-
-        return True, f"Successfully processed {len(filtered_rows)} seminars", len(filtered_rows)
+        stat = DISPLAYS_CONFIG.stat()
+        key = (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        key = None
+    if _displays['profiles'] is None or _displays['key'] != key:
+        _displays['profiles'] = load_display_profiles(DISPLAYS_CONFIG)
+        _displays['key'] = key
+    return _displays['profiles']
+
+
+def display_window(profile, today):
+    """(first date, last date) a display shows on the given day"""
+    if profile.days is None:
+        return max(get_current_week_start(today), today), get_current_week_end(today)
+    return today, today + timedelta(days=profile.days - 1)
+
+
+def pipeline_selection(profiles, today):
+    """Tags and date window the event table must cover for every display to be served
+    Returns (tags, (first date, last date)), the union over profiles.
+    """
+    tags = tuple(sorted({tag for profile in profiles for tag in profile.tags}))
+    windows = [display_window(profile, today) for profile in profiles]
+    return tags, (min(first for first, _ in windows), max(last for _, last in windows))
+
+
+def has_display_index(snapshot):
+    """Whether a snapshot carries the tag/location index (generations published before
+    display profiles don't, and can only be served whole to the default display)"""
+    return snapshot is not None and snapshot.index is not None and 'by_tag' in snapshot.index
+
+
+def display_rows(index, profile, now):
+    """Row positions a display shows at now, in body order
+    Rows come from the tag and location postings (every location when the profile lists
+    none) and are kept if they fall in the display's date window and have not started.
+    """
+    first, last = (day.isoformat() for day in display_window(profile, now.date()))
+    cut = bisect.bisect_right(index['expires'], now.strftime(EXPIRY_FORMAT))
+
+    rows = set()
+    for tag in profile.tags:
+        rows.update(index['by_tag'].get(tag, ()))
+    if profile.locations:
+        at_locations = set()
+        for location in profile.locations:
+            at_locations.update(index['by_location'].get(location, ()))
+        rows &= at_locations
+
+    dates = index['dates']
+    return [row for row in sorted(rows) if row >= cut and first <= dates[row] <= last]
+
+
+def render_display(snapshot, profile, now):
+    """Build the snapshot as a display shows it at now (see display_rows)
+    The body is the header plus the chosen rows' bytes sliced out of the snapshot, and
+    the ETag a hash of it. Last-Modified moves up to the last expiry passed and to the
+    start of today (when the date window moves), so it stays a safe validator.
+    """
+    index = snapshot.index
+    body = snapshot.body
+    offsets = index['offsets']
+    chunks = [body[:index['header_end']]]
+    rows = display_rows(index, profile, now)
+    for row in rows:
+        chunks.append(body[offsets[row]:offsets[row + 1] if row + 1 < len(offsets) else len(body)])
+    view_body = b''.join(chunks)
+
+    last_modified = max(snapshot.last_modified,
+                        datetime.combine(now.date(), datetime.min.time()).astimezone(timezone.utc))
+    cut = bisect.bisect_right(index['expires'], now.strftime(EXPIRY_FORMAT))
+    if cut:
+        last_expired = datetime.strptime(index['expires'][cut - 1], EXPIRY_FORMAT).astimezone(timezone.utc)
+        last_modified = max(last_modified, last_expired)
+
+    return snapshot._replace(
+        body=view_body,
+        etag=hashlib.sha256(view_body).hexdigest()[:32],
+        last_modified=last_modified,
+        index=None,
+        events=view_events(index, rows),
+    )
+
+
+def display_view(profile, now=None):
+    """The current snapshot as a display shows it now, cached per snapshot, profile and minute
+    Returns None when nothing is published, or when the snapshot predates display
+    profiles and profile is not the default display (which then gets upcoming_view).
+    """
+    snapshot = current_snapshot()
+    if not has_display_index(snapshot):
+        return upcoming_view(now) if profile.name == DEFAULT_DISPLAY else None
+
+    if now is None:
+        now = datetime.now()
+    key = (snapshot.source_key, snapshot.etag, profile, now.strftime(EXPIRY_FORMAT))
+    cached = _display_views.get(profile.name)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    view = render_display(snapshot, profile, now)
+    _display_views[profile.name] = (key, view)
+    return view
+
+
+def display_renditions(profile):
+    """CSV, JSON and ICS renditions of a display's current view ({extension: Rendition})
+    Built (and compressed) once per view, i.e. per published generation and whenever an
+    event drops off; None when nothing is published for the display.
+    """
+    view = display_view(profile)
+    if view is None:
+        return None
+    cached = _display_renditions.get(profile.name)
+    if cached is not None and cached[0] == view.etag:
+        return cached[1]
+
+    import pytz
+    renditions = build_renditions(view, pytz.timezone(DISPLAY_TIMEZONE))
+    _display_renditions[profile.name] = (view.etag, renditions)
+    return renditions
+
+
+def job_path(job_id):
+    """Path of a job record"""
+    return JOBS_DIR / f'{job_id}.json'
+
+
+def save_job(job):
+    """Persist a job record (atomically, so readers in other workers never see half of it)"""
+    JOBS_DIR.mkdir(parents=True, exist_ok=True)
+    write_atomic(job_path(job['id']), json.dumps(job).encode('utf-8'))
+
+
+def load_job(job_id):
+    """Load a job record by ID (None if unknown or expired)
+    Queued and running jobs whose process is gone (see job_lost) are reported as failed.
+    """
+    if not re.fullmatch(r'[0-9a-f]{32}', job_id):
+        return None
+    job = read_json(job_path(job_id))
+    if job is not None and job_lost(job):
+        job.update(state='failed', stage=None, result={
+            'success': False,
+            'message': 'The server restarted before this upload was processed. Please upload the file again.',
+            'count': 0,
+        })
+    return job
+
+
+def job_lost(job):
+    """Whether a queued or running job can no longer finish
+    Jobs run in the executor of the process that accepted them, so they are lost when
+    that process exits (a worker restart or a redeploy).
+    """
+    if job['state'] not in ('queued', 'running'):
+        return False
+    return job.get('run_id') != RUN_ID or not process_alive(job['pid'])
+
+
+def prune_jobs():
+    """Delete job records older than JOB_RETENTION"""
+    cutoff = time.time() - JOB_RETENTION
+    for path in JOBS_DIR.glob('*.json'):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except FileNotFoundError:
+            continue
+
+
+def upload_path(job_id):
+    """Path of an upload job's own copy of the uploaded file"""
+    return UPLOADS_DIR / f'{job_id}.xlsx'
+
+
+def run_pipeline_job(job, excel_file, replace=False):
+    """Executor task: run the pipeline for a job, recording stage timings and the result
+    An upload's file (see upload_path) becomes EXCEL_STORAGE, and its hash LAST_UPLOAD,
+    once its events are in the store; otherwise the file is deleted.
+    """
+    def keep_upload():
+        with upload_lock():
+            os.replace(excel_file, EXCEL_STORAGE)
+            write_atomic(LAST_UPLOAD, json.dumps(dict(job['upload'], job_id=job['id'])).encode('utf-8'))
+        logger.info(f"Kept the upload of job {job['id']} as {EXCEL_STORAGE}")
+
+    try:
+        job.update(state='running', stage=PIPELINE_STAGES[0], started_at=datetime.now().isoformat())
+        save_job(job)
+
+        def on_stage(name, seconds, rows_in, rows_out):
+            job['stages'][name] = {'seconds': round(seconds, 4), 'rows_in': rows_in, 'rows_out': rows_out}
+            done = PIPELINE_STAGES.index(name) + 1
+            job['progress'] = round(done / len(PIPELINE_STAGES), 2)
+            job['stage'] = PIPELINE_STAGES[done] if done < len(PIPELINE_STAGES) else None
+            save_job(job)
+
+        stats = {}
+        success, message, count = process_excel_to_csv(excel_file, on_stage=on_stage, stats=stats, replace=replace,
+                                                       on_ingest=keep_upload if excel_file is not None else None)
+        job['state'] = 'succeeded' if success else 'failed'
+        job['result'] = {'success': success, 'message': message, 'count': count, 'stats': stats}
+        logger.info(f"Job {job['id']} {job['state']}: {message}")
 
     except Exception as e:
-        return False, f"Error processing file: {str(e)}", 0
+        logger.error(f"Job {job['id']} exception: {str(e)}")
+        job['state'] = 'failed'
+        job['result'] = {'success': False, 'message': f'Server error: {str(e)}', 'count': 0}
+
+    finally:
+        if excel_file is not None:
+            Path(excel_file).unlink(missing_ok=True)
+        job.update(stage=None, finished_at=datetime.now().isoformat())
+        if job['state'] == 'succeeded':
+            job['progress'] = 1.0
+        save_job(job)
+        _job_slots.release()
+
+
+def list_jobs():
+    """Every job record in JOBS_DIR"""
+    jobs = []
+    for path in JOBS_DIR.glob('*.json'):
+        job = read_json(path)
+        if job is not None:
+            jobs.append(job)
+    return jobs
+
+
+def upload_job(digest, mode):
+    """Job already handling an upload of this content and mode, if it is the latest upload
+    The latest upload is the newest upload job still queued or running, or else the last
+    one whose events were committed (LAST_UPLOAD); jobs that failed don't count. Call
+    under upload_lock().
+    """
+    pending = [job for job in list_jobs()
+               if job.get('upload') and job['state'] in ('queued', 'running') and not job_lost(job)]
+    if pending:
+        latest = max(pending, key=lambda job: job['created_at'])
+        return latest if latest['upload'] == {'sha256': digest, 'mode': mode} else None
+
+    last_upload = read_json(LAST_UPLOAD)
+    if last_upload is None or (last_upload['sha256'], last_upload['mode']) != (digest, mode):
+        return None
+    job = load_job(last_upload['job_id'])
+    if job is None or job['state'] == 'failed':
+        return None
+    return job
+
+
+def upload_lock():
+    """Serialize accepting uploads across threads and processes (see upload_job)"""
+    return file_lock(UPLOAD_LOCK, _upload_lock)
+
+
+def submit_pipeline_job(kind, spool=None, replace=False, upload=None):
+    """Queue a pipeline run on the background executor
+    An uploaded file (spool, see UploadSpool) is saved as the job's own file in UPLOADS_DIR
+    and ingested from there; upload ({'sha256', 'mode'}) is kept in the job record for
+    upload_job. Returns the new job record, or None when MAX_PENDING_JOBS are
+    already queued or running (the upload is then not saved).
+    """
+    if not _job_slots.acquire(blocking=False):
+        return None
+
+    job = {
+        'id': uuid.uuid4().hex,
+        'kind': kind,
+        'state': 'queued',
+        'stage': None,
+        'progress': 0.0,
+        'stages': {},
+        'result': None,
+        'upload': upload,
+        'run_id': RUN_ID,
+        'pid': os.getpid(),
+        'created_at': datetime.now().isoformat(),
+        'started_at': None,
+        'finished_at': None,
+    }
+    excel_file = None
+    try:
+        if spool is not None:
+            UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
+            excel_file = upload_path(job['id'])
+            spool.save_as(excel_file)
+        save_job(job)
+        prune_jobs()
+        _job_executor.submit(run_pipeline_job, job, excel_file, replace)
+    except Exception:
+        if excel_file is not None:
+            excel_file.unlink(missing_ok=True)
+        _job_slots.release()
+        raise
+    return job
+
+
+def display_template(width=None):
+    """Display template with hashed asset URLs for a display width, split around the
+    seminar list as (before, after) (cached per width)"""
+    template = _display_templates.get(width)
+    if template is None:
+        page = assets.rewrite(DISPLAY_TEMPLATE.read_text(encoding='utf-8'), width)
+        before, _, rest = page.partition(SEMINARS_START)
+        _, _, after = rest.partition(SEMINARS_END)
+        template = _display_templates[width] = (before + SEMINARS_START, SEMINARS_END + after)
+    return template
+
+
+def seminars_html(view):
+    """Seminar list of a display view (its CSV parsed with the csv module), as HTML
+    It starts with the view's ETag as data-version, which the page compares with the
+    versions /events announces.
+    """
+    if view is None:
+        return ('\n            <p style="text-align: center; color: #d32f2f; padding: 40px; font-size: 18px;">'
+                'Unable to load seminar data</p>\n            ')
+    items = []
+    for row in csv_rows(view.body):
+        date_text, time_text, title, speaker, location = (html.escape(row.get(column) or '') for column in (
+            'Date_Formatted', 'Time', 'Title', 'Speaker', 'Location'))
+        items.append(f"""
+            <div class="seminar">
+                <div class="date-time">
+                    <span class="date">{date_text}</span> •
+                    <span class="time">{time_text}</span>
+                </div>
+                <div class="title">
+                    {title}
+                </div>
+                <div class="speaker">
+                    <span class="speaker-label">Speaker:</span>
+                    <span class="speaker-name">{speaker}</span>
+                </div>
+                <div class="location">
+                    <span class="location-label">Location:</span>
+                    <span>{location}</span>
+                </div>
+            </div>""")
+    version = f'\n            <div id="seminars-version" data-version="{html.escape(view.etag)}" hidden></div>'
+    if not items:
+        return (version + '\n            <p style="text-align: center; color: #999; padding: 40px; font-size: 18px;">'
+                'No seminars this week</p>\n            ')
+    return version + ''.join(items) + '\n            '
+
+
+def display_page(profile, width=None):
+    """Display page with the seminars a display shows now, as (body, etag)
+    Cached per display and width until its view (see display_view) changes, so a page
+    is only rendered again for a new snapshot or when an event drops off.
+    """
+    view = display_view(profile)
+    etag = view.etag if view is not None else None
+    cached = _display_pages.get((profile.name, width))
+    if cached is not None and cached[0] == etag:
+        return cached[1]
+
+    before, after = display_template(width)
+    body = (before + seminars_html(view) + after).encode('utf-8')
+    page = (body, hashlib.sha256(body).hexdigest()[:32])
+    _display_pages[profile.name, width] = (etag, page)
+    return page
 
 
 @app.route('/')
 def index():
-    """Serve display template"""
-    return send_file('template_simple.html', mimetype='text/html')
+    """Serve the display page with this week's seminars rendered in
+    ?display=<name> shows that display profile's seminars (default: the default one) and
+    ?width= (the display's width in pixels) picks the image variants; by default they
+    suit a 1920 pixel display. The page refreshes its seminar list from this same URL.
+    """
+    profile = display_profiles().get(request.args.get('display', DEFAULT_DISPLAY))
+    if profile is None:
+        return "Unknown display", 404
+    width = request.args.get('width', type=int)
+    if width is not None and not 0 < width <= MAX_DISPLAY_WIDTH:
+        width = None
+    # Widths picking the same image variants share one cached page
+    body, etag = display_page(profile, assets.width_class(width))
+    response = app.response_class(body, mimetype='text/html')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 
 @app.route('/admin')
@@ -302,18 +1234,211 @@ def admin():
     return send_file('admin.html', mimetype='text/html')
 
 
-@app.route('/seminarier.csv')
-def serve_csv():
-    """Serve CSV data file"""
+def rendition_response(profile, extension, negotiated=False):
+    """A display's seminars in one of FORMATS, from memory (304 when the client's copy is current)
+    The body is the precompressed one matching Accept-Encoding; each coding has its own ETag.
+    negotiated says the format was picked from Accept, which caches must then key on too.
+    """
+    renditions = display_renditions(profile)
+    if renditions is None:
+        return f"{extension.upper()} file not found", 404
+
+    rendition = renditions[extension]
+    coding = pick_encoding(rendition, request.accept_encodings)
+    response = app.response_class(rendition.bodies[coding], mimetype=rendition.mimetype)
+    if coding == 'identity':
+        response.set_etag(rendition.etag)
+    else:
+        response.content_encoding = coding
+        response.set_etag(f'{rendition.etag}-{coding}')
+    response.last_modified = rendition.last_modified
+    response.cache_control.no_cache = True
+    response.vary.add('Accept-Encoding')
+    if negotiated:
+        response.vary.add('Accept')
+    return response.make_conditional(request)
+
+
+def negotiated_format():
+    """Extension of the format of FORMATS the Accept header prefers (CSV when it has none)"""
+    mimetype = request.accept_mimetypes.best_match(list(FORMATS.values()), default=FORMATS['csv'])
+    return next(extension for extension, candidate in FORMATS.items() if candidate == mimetype)
+
+
+@app.route('/seminarier.<extension>')
+@app.route('/seminarier')
+def serve_seminars(extension=None):
+    """Serve the default display's seminars as CSV, JSON or ICS (by extension, else Accept)"""
+    negotiated = extension is None
+    if negotiated:
+        extension = negotiated_format()
+    elif extension not in FORMATS:
+        return "Unknown format", 404
+    return rendition_response(display_profiles()[DEFAULT_DISPLAY], extension, negotiated)
+
+
+@app.route('/d/<display>/seminarier.<extension>')
+@app.route('/d/<display>/seminarier')
+def serve_display_seminars(display, extension=None):
+    """Serve a named display's seminars (profiles in DISPLAYS_CONFIG), like /seminarier"""
+    profile = display_profiles().get(display)
+    if profile is None:
+        return "Unknown display", 404
+    negotiated = extension is None
+    if negotiated:
+        extension = negotiated_format()
+    elif extension not in FORMATS:
+        return "Unknown format", 404
+    return rendition_response(profile, extension, negotiated)
+
+
+@app.route('/api/displays', methods=['GET'])
+def list_displays():
+    """List the configured display profiles and the URLs of their CSV (and other formats)"""
+    return jsonify({'displays': [{
+        'name': profile.name,
+        'tags': list(profile.tags),
+        'locations': list(profile.locations),
+        'window': 'week' if profile.days is None else {'days': profile.days},
+        'url': '/seminarier.csv' if profile.name == DEFAULT_DISPLAY else f'/d/{profile.name}/seminarier.csv',
+        'formats': {extension: ('/seminarier' if profile.name == DEFAULT_DISPLAY else f'/d/{profile.name}/seminarier')
+                    + f'.{extension}' for extension in FORMATS},
+    } for profile in display_profiles().values()]})
+
+
+def query_date(name):
+    """ISO date query parameter (None when absent; ValueError if malformed)"""
+    value = request.args.get(name)
+    if not value:
+        return None
     try:
-        return send_file('seminarier.csv', mimetype='text/csv')
-    except FileNotFoundError:
-        return "CSV file not found", 404
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be a date like 2025-01-31")
+
+
+@app.route('/api/events', methods=['GET'])
+def query_events():
+    """Events of the event store overlapping a date range, in start order
+    Parameters: from, to (ISO dates, default from today on), location, tag (exact,
+    case-insensitive), limit (default DEFAULT_LIMIT, at most MAX_LIMIT) and cursor (the
+    next_cursor of the previous page, sent with the same other parameters). Answered
+    from the in-memory EventIndex.
+    """
+    try:
+        first = query_date('from') or datetime.now().date()
+        last = query_date('to')
+        if last is not None and first > last:
+            raise ValueError("'from' must not be after 'to'")
+        limit = request.args.get('limit', str(DEFAULT_LIMIT))
+        if not limit.isdigit() or not 1 <= int(limit) <= MAX_LIMIT:
+            raise ValueError(f"'limit' must be between 1 and {MAX_LIMIT}")
+
+        index = get_event_index()
+        if index is None and EXCEL_STORAGE.exists():
+            # A workbook is stored but the startup run has not loaded it into the store yet
+            return jsonify({'error': 'Events are still being loaded. Please try again shortly.'}), 503, \
+                {'Retry-After': str(EVENTS_LOADING_RETRY)}
+        if index is None:
+            return jsonify({'error': 'No Excel file found. Please upload an Excel file first.'}), 404
+        events, next_cursor = index.query(first, last, location=request.args.get('location'),
+                                          tag=request.args.get('tag'), cursor=request.args.get('cursor'),
+                                          limit=int(limit))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'events': [{field: event[field] for field in EVENT_FIELDS} for event in events],
+        'count': len(events),
+        'next_cursor': next_cursor,
+    }), 200
+
+
+@app.route('/events')
+def snapshot_events():
+    """Server-Sent Events stream announcing each change of the served CSV (by ETag)
+    ?display=<name> follows that display's CSV instead of the default one. Snapshots
+    published in this process are pushed immediately, those from other workers and
+    events dropping off the view within SNAPSHOT_CHECK_INTERVAL. The stream closes after
+    EVENTS_MAX_DURATION and EventSource reconnects on its own. Beyond EVENTS_MAX_STREAMS
+    open streams the request gets a 503 (the display page then polls).
+    """
+    display = request.args.get('display', DEFAULT_DISPLAY)
+    if display not in display_profiles():
+        return "Unknown display", 404
+    if not _event_streams.acquire(blocking=False):
+        metrics.inc('smartsign_event_streams_refused_total')
+        return Response("Too many live update streams", status=503,
+                        headers={'Retry-After': str(EVENTS_REFUSED_RETRY)})
+
+    def stream():
+        yield f"retry: {EVENTS_RETRY_MS}\n\n"
+        started = last_sent = time.monotonic()
+        last_etag = None
+
+        while time.monotonic() - started < EVENTS_MAX_DURATION:
+            profile = display_profiles().get(display)
+            snapshot = display_view(profile) if profile is not None else None
+            if snapshot is not None and snapshot.etag != last_etag:
+                last_etag = snapshot.etag
+                last_sent = time.monotonic()
+                yield f"event: snapshot\ndata: {snapshot.etag}\n\n"
+            elif time.monotonic() - last_sent >= EVENTS_KEEPALIVE:
+                last_sent = time.monotonic()
+                yield ": keepalive\n\n"
+
+            with _snapshot_published:
+                _snapshot_published.wait(timeout=SNAPSHOT_CHECK_INTERVAL)
+
+    response = Response(stream_with_context(stream()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+    response.call_on_close(_event_streams.release)
+    return response
+
+
+@app.route('/api/generations', methods=['GET'])
+def list_published_generations():
+    """List the published generations that can be rolled back to"""
+    snapshot = current_snapshot()
+    return jsonify({
+        'current': snapshot.generation if snapshot is not None else None,
+        'generations': list_generations(),
+    })
+
+
+@app.route('/api/rollback', methods=['POST'])
+def rollback():
+    """Roll the displays back to an earlier generation (JSON body: {"generation": N}, optional)"""
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'error': 'Expected a JSON object'}), 400
+    generation = data.get('generation')
+    if isinstance(generation, bool):
+        return jsonify({'success': False, 'error': 'Invalid generation'}), 400
+
+    try:
+        generation = int(generation) if generation is not None else None
+    except (TypeError, ValueError, OverflowError):
+        return jsonify({'success': False, 'error': 'Invalid generation'}), 400
+
+    snapshot = rollback_snapshot(generation)
+    if snapshot is None:
+        return jsonify({'success': False, 'error': 'No such generation to roll back to'}), 404
+
+    return jsonify({
+        'success': True,
+        'message': f'Rolled back to generation {snapshot.generation}',
+        'generation': snapshot.generation
+    }), 200
 
 
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
-    """Handle Excel file upload and save for daily filtering"""
+    """Handle Excel file upload and merge its events into the event store
+    Form field mode=replace (default merge) makes the upload the complete set of events.
+    """
     if 'file' not in request.files:
         return jsonify({'error': 'No file provided'}), 400
 
@@ -326,61 +1451,99 @@ def upload_file():
     if not file.filename.lower().endswith(('.xlsx', '.xls')):
         return jsonify({'error': 'Invalid file type. Please upload Excel (.xlsx or .xls)'}), 400
 
-    # Validate file size (10MB)
-    file_content = file.read()
-    if len(file_content) > 10 * 1024 * 1024:
-        return jsonify({'error': 'File is too large. Maximum size is 10MB'}), 400
+    mode = request.form.get('mode', 'merge')
+    if mode not in ('merge', 'replace'):
+        return jsonify({'error': "Invalid mode. Use 'merge' or 'replace'"}), 400
 
-    file.seek(0)  # Reset file pointer
+    # Size was enforced and the hash computed while streaming (see UploadSpool)
+    spool = file.stream
+    digest = spool.sha256.hexdigest()
 
     try:
-        # Save Excel file permanently for daily filtering
-        with open(EXCEL_STORAGE, 'wb') as f:
-            f.write(file_content)
-        logger.info(f"Saved Excel file to {EXCEL_STORAGE}")
-
-        file.seek(0)  # Reset again for processing
-
-        # Process Excel file immediately
-        success, message, count = process_excel_to_csv(file)
-
-        if not success:
-            return jsonify({'error': message}), 400
-
-        # Success!
-        logger.info(f"Processed {count} seminars from uploaded file")
+        with upload_lock():
+            # The same file again (e.g. a double submit) gets the job already processing it
+            job = upload_job(digest, mode)
+            if job is not None:
+                metrics.inc('smartsign_uploads_deduplicated_total')
+                logger.info(f"Upload matches sha256 {digest[:12]} of job {job['id']}, not processing it again")
+                return jsonify({
+                    'success': True,
+                    'message': 'File is identical to the previous upload.',
+                    'job_id': job['id'],
+                    'status_url': f"/api/jobs/{job['id']}",
+                    'duplicate': True
+                }), 200 if job['state'] == 'succeeded' else 202
+
+            # Ingest and process the upload in the background, from the job's own copy
+            job = submit_pipeline_job('upload', spool, replace=(mode == 'replace'),
+                                      upload={'sha256': digest, 'mode': mode})
+            if job is None:
+                return jsonify({'error': 'Too many uploads are being processed. Please try again shortly.'}), 503
+            logger.info(f"Saved upload to {upload_path(job['id'])} ({spool.size} bytes, sha256 {digest[:12]})")
+
+        logger.info(f"Queued job {job['id']} for uploaded file")
         return jsonify({
             'success': True,
-            'message': f'Successfully updated with {count} seminars! The file will be automatically filtered daily at midnight.'
-        }), 200
+            'message': 'File uploaded. Processing has started.',
+            'job_id': job['id'],
+            'status_url': f"/api/jobs/{job['id']}"
+        }), 202
 
     except Exception as e:
         logger.error(f"Upload error: {str(e)}")
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
 
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    """Reject oversize uploads (cut off while streaming) with a JSON error"""
+    return jsonify({'error': 'File is too large. Maximum size is 10MB'}), 413
+
+
+@app.teardown_request
+def discard_upload_spools(exc=None):
+    """Delete temp files of uploads that were rejected or not saved"""
+    for spool in request.environ.get('smartsign.upload_spools', []):
+        spool.discard()
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Report progress, stage timings and result of a background pipeline job"""
+    job = load_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job), 200
+
+
 @app.route('/api/sync', methods=['POST'])
 def manual_sync():
-    """Manual sync endpoint - triggers immediate filtering"""
+    """Manual sync endpoint - triggers immediate filtering
+    Syncs that pile up behind a running pipeline all share the one run that follows it.
+    """
     logger.info("Manual sync triggered via API")
+    requested_at = time.time()
 
     try:
-        if not EXCEL_STORAGE.exists():
+        if not EXCEL_STORAGE.exists() and not event_store.revision():
             return jsonify({
                 'success': False,
                 'error': 'No Excel file found. Please upload an Excel file first via the admin interface.',
                 'count': 0
             }), 404
 
-        # Run the daily filter
-        success, message, count = process_excel_to_csv(EXCEL_STORAGE)
+        # Run the daily filter (from the event store), unless a run that started after this
+        # request already did
+        stats = {}
+        success, message, count = process_excel_to_csv(stats=stats, since=requested_at)
 
         if success:
             logger.info(f"Manual sync successful: {count} seminars")
             return jsonify({
                 'success': True,
                 'message': message,
-                'count': count
+                'count': count,
+                'stats': stats
             }), 200
         else:
             logger.error(f"Manual sync failed: {message}")
@@ -405,40 +1568,53 @@ def health():
     return jsonify({'status': 'ok', 'service': 'SmartSign Server'})
 
 
+@app.route('/metrics')
+def serve_metrics():
+    """Prometheus metrics, merged across all workers"""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def asset_response(asset, immutable=False):
+    """Response for an in-memory asset
+    Hashed URLs never change content, so they are cached for ASSET_MAX_AGE without
+    revalidation; plain names are revalidated (cheap 304s) on every load.
+    """
+    response = app.response_class(asset.body, mimetype=asset.mimetype)
+    response.set_etag(asset.etag)
+    if immutable:
+        response.cache_control.public = True
+        response.cache_control.max_age = ASSET_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+@app.route('/assets/<filename>')
+def serve_asset(filename):
+    """Serve a logo/background (or a resized variant) by content-hashed name"""
+    asset = assets.get(filename)
+    if asset is None:
+        return "Asset not found", 404
+    return asset_response(asset, immutable=True)
+
+
 @app.route('/iml_logo.png')
 def serve_logo():
-    """Serve IML logo with explicit mimetype (query params ignored for cache busting)"""
-    logo_path = BASE_DIR / 'static' / 'iml_logo.png'
-    if logo_path.exists():
-        with open(logo_path, 'rb') as f:
-            return app.response_class(
-                f.read(),
-                mimetype='image/png',
-                headers={
-                    'Cache-Control': 'no-cache, no-store, must-revalidate',
-                    'Pragma': 'no-cache',
-                    'Expires': '0'
-                }
-            )
-    return "Logo not found", 404
+    """Serve IML logo by its plain name (templates not served by this app; query params ignored)"""
+    asset = assets.original('iml_logo.png')
+    if asset is None:
+        return "Logo not found", 404
+    return asset_response(asset)
 
 
 @app.route('/iml_background.png')
 def serve_background():
-    """Serve IML background with explicit mimetype (query params ignored for cache busting)"""
-    bg_path = BASE_DIR / 'static' / 'iml_background.png'
-    if bg_path.exists():
-        with open(bg_path, 'rb') as f:
-            return app.response_class(
-                f.read(),
-                mimetype='image/png',
-                headers={
-                    'Cache-Control': 'no-cache, no-store, must-revalidate',
-                    'Pragma': 'no-cache',
-                    'Expires': '0'
-                }
-            )
-    return "Background not found", 404
+    """Serve IML background by its plain name (templates not served by this app; query params ignored)"""
+    asset = assets.original('iml_background.png')
+    if asset is None:
+        return "Background not found", 404
+    return asset_response(asset)
 
 
 @app.route('/debug/files')
@@ -459,9 +1635,20 @@ def debug_files():
 
 
 @app.before_request
-def before_request():
-    """Log incoming requests"""
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] {request.method} {request.path}")
+def start_request_timer():
+    """Note when the request started (see record_request_metrics)"""
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Record request latency by route pattern (not path, so IDs don't multiply series)"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        metrics.observe('smartsign_http_request_duration_seconds', time.perf_counter() - started,
+                        route=route, method=request.method, status=str(response.status_code))
+    return response
 
 
 def run_daily_filter():
@@ -471,16 +1658,15 @@ def run_daily_filter():
     logger.info("=" * 80)
 
     try:
-        if not EXCEL_STORAGE.exists():
-            logger.warning(f"No Excel file found at {EXCEL_STORAGE}. Skipping daily filter.")
+        if not EXCEL_STORAGE.exists() and not event_store.revision():
+            logger.warning(f"No events stored in {EVENT_STORE}. Skipping daily filter.")
             logger.warning("Please upload an Excel file via /admin to enable automatic filtering.")
             return
 
-        logger.info(f"Processing Excel file: {EXCEL_STORAGE}")
-        logger.info(f"File last modified: {datetime.fromtimestamp(EXCEL_STORAGE.stat().st_mtime).strftime('%Y-%m-%d %H:%M:%S')}")
+        logger.info(f"Processing stored events: {EVENT_STORE}")
 
-        # Process the saved Excel file
-        success, message, count = process_excel_to_csv(EXCEL_STORAGE)
+        # Re-filter from the event store
+        success, message, count = process_excel_to_csv()
 
         if success:
             logger.info(f"[SUCCESS] Daily filter completed: {count} seminars")
@@ -500,6 +1686,10 @@ def run_daily_filter():
 
 def start_scheduler():
     """Start background scheduler for daily filtering"""
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from apscheduler.triggers.cron import CronTrigger
+    import pytz
+
     scheduler = BackgroundScheduler()
 
     # Swedish timezone
@@ -512,7 +1702,9 @@ def start_scheduler():
         trigger=trigger,
         id='daily_filter',
         name='Daily Seminar Filter',
-        replace_existing=True
+        replace_existing=True,
+        misfire_grace_time=3600,
+        coalesce=True
     )
 
     scheduler.start()
@@ -521,14 +1713,39 @@ def start_scheduler():
     logger.info("Daily filter job scheduled for 00:00 Stockholm time")
     logger.info("=" * 80)
 
-    # Run immediately on startup if Excel file exists (for testing)
-    if EXCEL_STORAGE.exists():
+    # Run immediately on startup if there are events (for testing)
+    if EXCEL_STORAGE.exists() or event_store.revision():
         logger.info("Running initial filter on startup...")
         run_daily_filter()
 
     return scheduler
 
 
+def start_scheduler_leader():
+    """Start the scheduler in exactly one process (for multi-worker gunicorn)
+    Every worker calls this (see gunicorn.conf.py). Each waits in a daemon thread for an
+    exclusive lock on SCHEDULER_LOCK; the holder runs the scheduler, and when it exits the
+    lock passes to a waiting worker. Other workers pick up published snapshots from disk.
+    Set SCHEDULER_MODE=off to disable scheduling in this process.
+    """
+    if os.environ.get('SCHEDULER_MODE', 'leader') == 'off':
+        logger.info("Scheduler disabled in this process (SCHEDULER_MODE=off)")
+        return
+
+    if fcntl is None:
+        _scheduler_leader['scheduler'] = start_scheduler()
+        return
+
+    def wait_for_leadership():
+        lock_file = open(SCHEDULER_LOCK, 'a')
+        fcntl.flock(lock_file, fcntl.LOCK_EX)  # Blocks until no other process holds it
+        _scheduler_leader['lock_file'] = lock_file
+        logger.info(f"Process {os.getpid()} is now the scheduler leader")
+        _scheduler_leader['scheduler'] = start_scheduler()
+
+    threading.Thread(target=wait_for_leadership, name='scheduler-leader', daemon=True).start()
+
+
 def run_server():
     """Start the server with automatic daily filtering"""
     port = int(os.environ.get('PORT', 8080))
@@ -541,10 +1758,12 @@ def run_server():
     print(f"Display template: http://localhost:{port}/")
     print(f"Admin upload:     http://localhost:{port}/admin")
     print(f"CSV data:         http://localhost:{port}/seminarier.csv")
+    print(f"Live updates:     http://localhost:{port}/events")
     print(f"Health check:     http://localhost:{port}/health")
+    print(f"Metrics:          http://localhost:{port}/metrics")
     print("=" * 80)
     print(f"Automatic filtering: Daily at 00:00 Stockholm time")
-    print(f"Excel storage:       {EXCEL_STORAGE}")
+    print(f"Event store:         {EVENT_STORE}")
     print("=" * 80)
 
     # Start background scheduler for daily filtering
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Static assets (logo, background) held in memory under content-hashed URLs
+Every file in the assets directory is read once and served as /assets/<name>.<hash><ext>,
+so responses can be cached forever and a changed file simply gets a new URL. Images
+wider than a display get resized variants for common display widths (with Pillow),
+recompressed as JPEG when they have no transparency; pages pick the
+smallest variant that still covers the display (see url()). Pillow is only imported
+when a variant is missing from the cache.
+"""
+
+import hashlib
+import io
+import mimetypes
+import os
+import re
+import struct
+import tempfile
+from collections import namedtuple
+from pathlib import Path
+
+# Display widths (pixels) that images get resized variants for
+VARIANT_WIDTHS = (1280, 1920, 2560)
+# Width assumed for displays that don't say (the templates' viewport width)
+DEFAULT_DISPLAY_WIDTH = 1920
+JPEG_QUALITY = 85
+
+# body: bytes served; width: pixel width for images (None otherwise)
+Asset = namedtuple('Asset', ['name', 'url', 'body', 'etag', 'mimetype', 'width'])
+
+
+def png_width(body):
+    """Pixel width from a PNG header (None if body is not a PNG)"""
+    if body[:8] != b'\x89PNG\r\n\x1a\n' or len(body) < 24:
+        return None
+    return struct.unpack('>I', body[16:20])[0]
+
+
+def resize_image(body, width):
+    """Image bytes scaled to width, as (bytes, extension): JPEG unless it has transparency"""
+    from PIL import Image
+    image = Image.open(io.BytesIO(body))
+    height = round(image.height * width / image.width)
+    image = image.resize((width, height), Image.LANCZOS)
+    output = io.BytesIO()
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image.save(output, 'PNG', optimize=True)
+        return output.getvalue(), '.png'
+    image.convert('RGB').save(output, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return output.getvalue(), '.jpg'
+
+
+class StaticAssets:
+    """Files of a directory by original name, with their variants and hashed URLs
+    Variants are built once and kept in cache_dir (when given), so later processes and
+    restarts only read them back.
+    """
+
+    def __init__(self, directory, prefix='/assets/', cache_dir=None, widths=VARIANT_WIDTHS):
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.widths = tuple(widths)
+        self.by_name = {}
+        self.by_filename = {}
+        self.originals = {}
+        self.load()
+
+    def load(self):
+        """Read every file and build its image variants (by_name lists them by width)"""
+        for path in sorted(self.directory.iterdir()) if self.directory.is_dir() else []:
+            if not path.is_file() or path.name.startswith('.'):
+                continue
+            body = path.read_bytes()
+            digest = hashlib.sha256(body).hexdigest()[:12]
+            original = self.originals[path.name] = self.add(
+                path.name, f'{path.stem}.{digest}{path.suffix}', body, png_width(body))
+            variants = [original]
+            if original.width is not None:
+                for width in self.widths:
+                    if width < original.width:
+                        variants.append(self.variant(path, digest, body, width))
+            self.by_name[path.name] = sorted(variants, key=lambda asset: asset.width or 0)
+
+    def add(self, name, filename, body, width):
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        asset = Asset(name, self.prefix + filename, body, filename, mimetype, width)
+        self.by_filename[filename] = asset
+        return asset
+
+    def variant(self, path, digest, body, width):
+        """Resized asset for a width, from cache_dir when it was built before"""
+        for ext in ('.jpg', '.png'):
+            filename = f'{path.stem}.{digest}.w{width}{ext}'
+            if self.cache_dir is not None and (self.cache_dir / filename).exists():
+                return self.add(path.name, filename, (self.cache_dir / filename).read_bytes(), width)
+
+        resized, ext = resize_image(body, width)
+        filename = f'{path.stem}.{digest}.w{width}{ext}'
+        if self.cache_dir is not None:
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(prefix='.asset-', dir=self.cache_dir)
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(resized)
+                os.replace(tmp_path, self.cache_dir / filename)
+            except OSError:
+                pass
+        return self.add(path.name, filename, resized, width)
+
+    def get(self, filename):
+        """Asset for a hashed file name from a URL (None if unknown)"""
+        return self.by_filename.get(filename)
+
+    def original(self, name):
+        """The unresized asset for an original file name (None if unknown)"""
+        return self.originals.get(name)
+
+    def url(self, name, display_width=None):
+        """Hashed URL of the smallest variant of name at least display_width wide
+        Non-images and images narrower than the display get the original.
+        """
+        variants = self.by_name[name]
+        display_width = display_width or DEFAULT_DISPLAY_WIDTH
+        return next((asset.url for asset in variants if asset.width is None or asset.width >= display_width),
+                    variants[-1].url)
+
+    def width_class(self, display_width):
+        """Smallest width picking the same variants as display_width (see url()): the next
+        variant width up, or one past the widest for displays wider than every variant"""
+        if display_width is None:
+            return None
+        return next((width for width in sorted(self.widths) if width >= display_width), max(self.widths) + 1)
+
+    def rewrite(self, html, display_width=None):
+        """HTML with quoted references to assets by original name ('logo.png', "logo.png?v=2",
+        url(logo.png)) replaced by their hashed URLs
+        """
+        for name in self.by_name:
+            pattern = r'''(?<=['"(])''' + re.escape(name) + r'''(?:\?[^'"()\s]*)?(?=['")])'''
+            html = re.sub(pattern, self.url(name, display_width), html)
+        return html
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Shared fixtures: server.py with its storage in a scratch directory per test
+"""
+
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import openpyxl
+import pytest
+
+# server.py picks its storage directory at import, so point it at a scratch dir first
+os.environ.setdefault('STORAGE_PATH', tempfile.mkdtemp(prefix='smartsign-test-'))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+EXPORT_HEADER = ['Id', 'Title', 'Tag(s)', 'Start date', 'Start time', 'End date', 'End time',
+                 'Description', 'Room location']
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """The server module with every file it keeps (event store, generations, jobs, locks)
+    and every in-memory cache moved to a fresh scratch STORAGE_PATH"""
+    import server
+    from event_store import EventStore
+
+    storage = tmp_path / 'storage'
+    storage.mkdir()
+    for name, filename in (('EXCEL_STORAGE', 'latest_export.xlsx'), ('EVENT_STORE', 'events.db'),
+                           ('PIPELINE_LOCK', 'pipeline.lock'), ('UPLOAD_LOCK', 'upload.lock'),
+                           ('SCHEDULER_LOCK', 'scheduler.lock'), ('LAST_RUN', 'last_run.json'),
+                           ('LAST_UPLOAD', 'last_upload.json'), ('JOBS_DIR', 'jobs'),
+                           ('UPLOADS_DIR', 'uploads'), ('ASSET_CACHE', 'assets'),
+                           ('PUBLISH_DIR', 'published'), ('CSV_PATH', 'seminarier.csv')):
+        monkeypatch.setattr(server, name, storage / filename)
+    monkeypatch.setattr(server, 'STORAGE_DIR', storage)
+    monkeypatch.setattr(server, 'CURRENT_POINTER', storage / 'published' / 'CURRENT')
+    monkeypatch.setattr(server, 'event_store', EventStore(storage / 'events.db'))
+
+    monkeypatch.setattr(server, '_snapshot', {'current': None, 'checked_at': 0.0})
+    monkeypatch.setattr(server, '_view', {'key': None, 'view': None})
+    monkeypatch.setattr(server, '_event_index', {'index': None, 'checked_at': 0.0})
+    monkeypatch.setattr(server, '_displays', {'key': None, 'profiles': None, 'checked_at': 0.0})
+    for name in ('_display_views', '_display_renditions', '_display_pages'):
+        monkeypatch.setattr(server, name, {})
+    return server
+
+
+@pytest.fixture
+def export_workbook():
+    """Build ProjectPlace-style export bytes from rows of EXPORT_HEADER values (dicts)"""
+    def build(rows):
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.title = 'Data'
+        sheet.append(EXPORT_HEADER)
+        for row in rows:
+            sheet.append([row.get(column) for column in EXPORT_HEADER])
+        body = io.BytesIO()
+        workbook.save(body)
+        return body.getvalue()
+    return build
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+EventIndex date-range queries, cursor paging and /api/events validation
+Run with: python -m pytest tests
+"""
+
+import threading
+from datetime import date, timedelta
+
+import pytest
+
+from event_index import EventIndex, encode_cursor
+
+FIRST_DAY = date(2026, 10, 1)
+
+
+def event(row, day, start_time='10:00', location='Kuskvillan', tags=('website',), days=1):
+    return {
+        'row': row, 'id': str(row), 'title': f'Talk {row}', 'date': day.isoformat(),
+        'start_time': start_time, 'end_date': (day + timedelta(days=days - 1)).isoformat(),
+        'location': location, 'tags': list(tags),
+    }
+
+
+@pytest.fixture
+def index():
+    """25 events, one a day from FIRST_DAY, every third in Gula villan and tagged seminar"""
+    return EventIndex([
+        event(row, FIRST_DAY + timedelta(days=row),
+              location='Gula villan' if row % 3 == 0 else 'Kuskvillan',
+              tags=('website', 'seminar') if row % 3 == 0 else ('website',))
+        for row in range(25)
+    ])
+
+
+def all_pages(index, **query):
+    pages = []
+    cursor = None
+    while True:
+        events, cursor = index.query(cursor=cursor, **query)
+        pages.append([e['row'] for e in events])
+        if cursor is None:
+            return pages
+
+
+def test_pages_cover_every_event_once_in_order(index):
+    pages = all_pages(index, limit=10)
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert sum(pages, []) == list(range(25))
+
+
+def test_exact_multiple_of_limit_has_no_empty_last_page(index):
+    pages = all_pages(index, first=FIRST_DAY, last=FIRST_DAY + timedelta(days=19), limit=10)
+    assert [len(page) for page in pages] == [10, 10]
+
+
+def test_cursor_paging_with_filters(index):
+    pages = all_pages(index, location='gula VILLAN ', limit=3)
+    assert sum(pages, []) == list(range(0, 25, 3))
+    assert all(len(page) <= 3 for page in pages)
+    assert sum(all_pages(index, tag='Seminar', limit=4), []) == list(range(0, 25, 3))
+
+
+def test_date_range_is_inclusive_and_overlapping_events_count():
+    index = EventIndex([
+        event(0, date(2026, 10, 1), days=5),  # 1-5 October
+        event(1, date(2026, 10, 3)),
+        event(2, date(2026, 10, 6)),
+    ])
+    events, cursor = index.query(first=date(2026, 10, 4), last=date(2026, 10, 6))
+    assert [e['row'] for e in events] == [0, 2]
+    assert cursor is None
+
+
+def test_same_day_events_sort_by_start_time_then_row():
+    day = date(2026, 10, 1)
+    index = EventIndex([event(0, day, '14:00'), event(1, day, '09:00'), event(2, day, '09:00')])
+    assert sum(all_pages(index, limit=1), []) == [1, 2, 0]
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', encode_cursor(('2026-10-01', '10:00', 'x')), '!!'])
+def test_malformed_cursor_is_a_value_error(index, cursor):
+    with pytest.raises(ValueError):
+        index.query(cursor=cursor)
+
+
+@pytest.fixture
+def api(server, export_workbook, tmp_path):
+    """A test client over an event store holding 30 events, one a day from FIRST_DAY"""
+    path = tmp_path / 'export.xlsx'
+    path.write_bytes(export_workbook([
+        {'Id': number, 'Title': f'Talk {number}', 'Tag(s)': 'Website',
+         'Start date': FIRST_DAY + timedelta(days=number), 'Start time': '10:00',
+         'Room location': 'Kuskvillan'}
+        for number in range(30)
+    ]))
+    server.ingest_into_store(path, replace=True)
+    return server.app.test_client()
+
+
+def test_api_pages_through_a_range(api):
+    ids = []
+    url = '/api/events?from=2026-10-01&to=2026-10-30&limit=7'
+    cursor = None
+    while True:
+        response = api.get(url + (f'&cursor={cursor}' if cursor else ''))
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['count'] == len(data['events']) <= 7
+        ids += [e['id'] for e in data['events']]
+        cursor = data['next_cursor']
+        if cursor is None:
+            break
+    assert ids == [str(number) for number in range(30)]
+
+
+@pytest.mark.parametrize('query', [
+    'limit=0', 'limit=1001', 'limit=-1', 'limit=ten',
+    'from=2026-10-10&to=2026-10-01', 'from=10/01/2026', 'to=tomorrow',
+    'from=2026-10-01&cursor=garbage',
+])
+def test_api_rejects_invalid_parameters_with_400(api, query):
+    response = api.get(f'/api/events?{query}')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_api_without_events_is_404(server):
+    assert server.app.test_client().get('/api/events').status_code == 404
+
+
+def test_api_answers_while_a_pipeline_run_holds_the_lock(server, api):
+    started = threading.Event()
+    release = threading.Event()
+
+    def pipeline_run():
+        with server.pipeline_lock():
+            started.set()
+            release.wait(10)
+
+    runner = threading.Thread(target=pipeline_run)
+    runner.start()
+    try:
+        started.wait(5)
+        server._event_index['checked_at'] = 0.0
+        response = api.get('/api/events?from=2026-10-01&limit=1')
+        assert response.status_code == 200
+        # Answered while the run still holds the lock
+        assert runner.is_alive()
+    finally:
+        release.set()
+        runner.join()
+
+
+def test_api_is_503_until_a_stored_workbook_is_loaded(server):
+    # Seeding the store is left to the pipeline runs (startup, scheduler, uploads)
+    server.EXCEL_STORAGE.write_bytes(b'not loaded yet')
+    response = server.app.test_client().get('/api/events')
+    assert response.status_code == 503
+    assert response.headers['Retry-After']
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+EventStore.ingest: added/changed/removed/reused counts, revisions and normalization
+Run with: python -m pytest tests
+"""
+
+import pytest
+
+from event_store import EventStore
+
+
+def row(event_id, title='Talk', location='Kuskvillan', start_time='10:00'):
+    # STORE_FIELDS order: id, title, description, speaker, tags, location, dates and times
+    return (event_id, title, '<b>Speaker</b><br/>Jane Doe, KTH<br/>', None, 'Website', location,
+            '2026-10-19', start_time, '2026-10-19', '11:00')
+
+
+class Normalizer:
+    """normalize() for EventStore.ingest that records which ids it was asked for"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, rows):
+        self.calls.append([r[0] for r in rows])
+        return [(f'{r[1]} (normalized)', 'Jane Doe, KTH') for r in rows]
+
+    def normalized(self):
+        return sorted(event_id for call in self.calls for event_id in call)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return EventStore(tmp_path / 'events.db')
+
+
+@pytest.fixture
+def seeded(store):
+    store.ingest([row('1'), row('2'), row('3')], Normalizer(), replace=True)
+    return store
+
+
+def test_first_ingest_adds_and_normalizes_everything(store):
+    normalize = Normalizer()
+    changes = store.ingest([row('1'), row('2'), row('3')], normalize)
+    assert changes == {'added': 3, 'changed': 0, 'removed': 0, 'reused': 0}
+    assert normalize.normalized() == ['1', '2', '3']
+    assert store.revision() == 1
+    assert store.count() == 3
+    assert {r[0]: r[-2] for r in store.query()} == {str(n): 'Talk (normalized)' for n in (1, 2, 3)}
+
+
+def test_identical_ingest_reuses_everything_and_keeps_the_revision(seeded):
+    normalize = Normalizer()
+    changes = seeded.ingest([row('1'), row('2'), row('3')], normalize, replace=True)
+    assert changes == {'added': 0, 'changed': 0, 'removed': 0, 'reused': 3}
+    assert normalize.calls == []
+    assert seeded.revision() == 1
+
+
+def test_title_change_renormalizes_only_that_event(seeded):
+    normalize = Normalizer()
+    changes = seeded.ingest([row('1'), row('2', title='New title'), row('3')], normalize)
+    assert changes == {'added': 0, 'changed': 1, 'removed': 0, 'reused': 2}
+    assert normalize.normalized() == ['2']
+    assert seeded.revision() == 2
+    assert {r[0]: r[-2] for r in seeded.query()}['2'] == 'New title (normalized)'
+
+
+def test_non_fingerprint_change_keeps_the_normalized_fields(seeded):
+    # Location and times are not what display titles and speakers derive from
+    normalize = Normalizer()
+    changes = seeded.ingest([row('1', location='Gula villan', start_time='09:00')], normalize)
+    assert changes == {'added': 0, 'changed': 1, 'removed': 0, 'reused': 1}
+    assert normalize.calls == []
+    stored = {r[0]: r for r in seeded.query()}['1']
+    assert stored[5] == 'Gula villan'
+    assert stored[-2] == 'Talk (normalized)'
+
+
+def test_merge_keeps_events_missing_from_the_upload(seeded):
+    changes = seeded.ingest([row('4')], Normalizer())
+    assert changes == {'added': 1, 'changed': 0, 'removed': 0, 'reused': 0}
+    assert seeded.count() == 4
+
+
+def test_replace_removes_events_missing_from_the_upload(seeded):
+    changes = seeded.ingest([row('2'), row('4')], Normalizer(), replace=True)
+    assert changes == {'added': 1, 'changed': 0, 'removed': 2, 'reused': 1}
+    assert sorted(r[0] for r in seeded.query()) == ['2', '4']
+    assert sorted(r[0] for r in seeded.query(tag='website')) == ['2', '4']
+    assert seeded.revision() == 2
+
+
+def test_failed_normalize_rolls_the_ingest_back(seeded):
+    def broken(rows):
+        raise RuntimeError('normalize failed')
+
+    with pytest.raises(RuntimeError):
+        seeded.ingest([row('1', title='Changed'), row('9')], broken, replace=True)
+    assert seeded.revision() == 1
+    assert sorted(r[0] for r in seeded.query()) == ['1', '2', '3']
+
+
+def test_revision_is_read_with_the_rows(seeded):
+    revision, rows = seeded.query_with_revision()
+    assert revision == 1
+    assert [r[0] for r in rows] == ['1', '2', '3']
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Started events leave the display minute by minute, without a pipeline run
+Run with: python -m pytest tests
+"""
+
+import csv
+import io
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+import pipeline
+
+MONDAY = date(2026, 10, 19)
+
+
+def seminar(title, time, expires):
+    return {
+        'Title_Original': title, 'Title': title, 'Speaker': '', 'Date': MONDAY.isoformat(),
+        'Date_Formatted': 'Monday 19 oct', 'Time': time, 'Location': 'Kuskvillan',
+        'Expires': expires, 'Tags': ['website'], 'Id': title, 'Ends': None,
+    }
+
+
+@pytest.fixture
+def published(server):
+    """One generation with events starting at 10:00, 11:00 and 14:00 and one untimed"""
+    rows = [
+        seminar('Untimed', '', '2026-10-20T00:00'),
+        seminar('Afternoon', '14:00', '2026-10-19T14:00'),
+        seminar('Ten', '10:00', '2026-10-19T10:00'),
+        seminar('Eleven', '11:00', '2026-10-19T11:00'),
+    ]
+    body, index = server.render_csv(rows)
+    with server.pipeline_lock():
+        server.publish_snapshot(body, index)
+    return server
+
+
+def titles(view):
+    return [row['Title'] for row in csv.DictReader(io.StringIO(view.body.decode('utf-8')))]
+
+
+def test_rows_are_ordered_by_expiry(published):
+    view = published.upcoming_view(now=datetime(2026, 10, 19, 8, 0))
+    assert titles(view) == ['Ten', 'Eleven', 'Afternoon', 'Untimed']
+    assert view.etag == published.current_snapshot().etag
+
+
+@pytest.mark.parametrize('now, expected', [
+    (datetime(2026, 10, 19, 9, 59), ['Ten', 'Eleven', 'Afternoon', 'Untimed']),
+    (datetime(2026, 10, 19, 10, 0), ['Eleven', 'Afternoon', 'Untimed']),
+    (datetime(2026, 10, 19, 10, 59), ['Eleven', 'Afternoon', 'Untimed']),
+    (datetime(2026, 10, 19, 11, 0), ['Afternoon', 'Untimed']),
+    (datetime(2026, 10, 19, 23, 59), ['Untimed']),
+    (datetime(2026, 10, 20, 0, 0), []),
+])
+def test_events_drop_off_in_the_minute_they_start(published, now, expected):
+    assert titles(published.upcoming_view(now=now)) == expected
+
+
+def test_etag_changes_only_when_an_event_drops_off(published):
+    server = published
+    before = server.upcoming_view(now=datetime(2026, 10, 19, 10, 0))
+    later = server.upcoming_view(now=datetime(2026, 10, 19, 10, 45))
+    after = server.upcoming_view(now=datetime(2026, 10, 19, 11, 0))
+
+    assert later.etag == before.etag
+    assert later.body == before.body
+    assert after.etag != before.etag
+    # Last-Modified moves up to the expiry just passed, so it stays a safe validator
+    assert after.last_modified >= datetime(2026, 10, 19, 11, 0).astimezone()
+
+
+def test_display_views_apply_the_same_cut(published):
+    server = published
+    profile = server.display_profiles()[server.DEFAULT_DISPLAY]
+    view = server.display_view(profile, now=datetime(2026, 10, 19, 10, 30))
+    assert titles(view) == ['Eleven', 'Afternoon', 'Untimed']
+    assert [event_id for event_id, _ in view.events] == ['Eleven', 'Afternoon', 'Untimed']
+
+
+def test_filter_skips_started_events_and_sets_expiry():
+    df = pd.DataFrame({
+        'Id': [1, 2, 3, 4],
+        'Title': ['Ten', 'Eleven', 'Untimed', 'Yesterday'],
+        'Tag(s)': ['Website'] * 4,
+        'Start date': pd.to_datetime(['2026-10-19', '2026-10-19', '2026-10-19', '2026-10-18']),
+        'Start time': [pd.Timedelta(hours=10), pd.Timedelta(hours=11), None, pd.Timedelta(hours=9)],
+        'Description': [''] * 4,
+        'Room location': ['Kuskvillan'] * 4,
+    })
+    rows = pipeline.filter_seminars(df, current_time=datetime(2026, 10, 19, 10, 30),
+                                    window=(date(2026, 10, 18), date(2026, 10, 23)))
+    assert {row['Title']: row['Expires'] for row in rows} == {
+        'Eleven': '2026-10-19T11:00',
+        'Untimed': '2026-10-20T00:00',
+    }
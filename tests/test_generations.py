@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Published generations: publish, activate, keep, list and roll back (/api/rollback)
+Run with: python -m pytest tests
+"""
+
+import pytest
+
+
+def csv_body(title):
+    return f'Title,Date\n{title},2026-10-19\n'.encode('utf-8')
+
+
+@pytest.fixture
+def published(server):
+    """Three published generations (index-less, so served whole), the third live"""
+    with server.pipeline_lock():
+        for title in ('first', 'second', 'third'):
+            server.publish_snapshot(csv_body(title))
+    return server
+
+
+def served_title(client):
+    return client.get('/seminarier.csv').get_data(as_text=True).splitlines()[1].split(',')[0]
+
+
+def test_publish_numbers_generations_and_serves_the_newest(published):
+    server = published
+    client = server.app.test_client()
+
+    assert server.list_generations() == [1, 2, 3]
+    assert server.CURRENT_POINTER.read_text().strip() == '3'
+    assert server.CSV_PATH.read_bytes() == csv_body('third')
+    assert client.get('/api/generations').get_json() == {'current': 3, 'generations': [1, 2, 3]}
+    assert served_title(client) == 'third'
+
+
+def test_activation_is_picked_up_from_disk(published):
+    # Another process only sees CURRENT_POINTER and the generation files
+    server = published
+    server._snapshot['current'] = None
+    snapshot = server.current_snapshot()
+    assert snapshot.generation == 3
+    assert snapshot.body == csv_body('third')
+
+
+def test_old_generations_are_pruned(server):
+    with server.pipeline_lock():
+        for number in range(server.PUBLISH_KEEP_GENERATIONS + 3):
+            server.publish_snapshot(csv_body(f'g{number}'))
+    generations = server.list_generations()
+    assert len(generations) == server.PUBLISH_KEEP_GENERATIONS
+    assert generations[-1] == server.PUBLISH_KEEP_GENERATIONS + 3
+
+
+def test_rollback_defaults_to_the_previous_generation(published):
+    client = published.app.test_client()
+
+    response = client.post('/api/rollback', json={})
+    assert response.status_code == 200
+    assert response.get_json()['generation'] == 2
+    assert served_title(client) == 'second'
+
+    response = client.post('/api/rollback')
+    assert response.status_code == 200
+    assert response.get_json()['generation'] == 1
+    assert served_title(client) == 'first'
+
+
+def test_rollback_to_a_named_generation_and_forward_again(published):
+    server = published
+    client = server.app.test_client()
+
+    assert client.post('/api/rollback', json={'generation': 1}).status_code == 200
+    assert server.CURRENT_POINTER.read_text().strip() == '1'
+    assert server.CSV_PATH.read_bytes() == csv_body('first')
+
+    response = client.post('/api/rollback', json={'generation': '3'})
+    assert response.status_code == 200
+    assert served_title(client) == 'third'
+
+
+def test_rollback_without_an_older_generation_is_404(published):
+    client = published.app.test_client()
+    assert client.post('/api/rollback', json={'generation': 1}).status_code == 200
+
+    response = client.post('/api/rollback', json={})
+    assert response.status_code == 404
+    assert response.get_json()['success'] is False
+    assert served_title(client) == 'first'
+
+
+@pytest.mark.parametrize('generation', [0, 4, 99, -1])
+def test_rollback_to_an_unknown_generation_is_404(published, generation):
+    client = published.app.test_client()
+    response = client.post('/api/rollback', json={'generation': generation})
+    assert response.status_code == 404
+    assert served_title(client) == 'third'
+
+
+@pytest.mark.parametrize('body', ['[1]', '"2"', '3', '{"generation": "abc"}', '{"generation": true}',
+                                  '{"generation": [2]}', '{"generation": 1.5e400}'])
+def test_rollback_rejects_malformed_bodies_with_400(published, body):
+    client = published.app.test_client()
+    response = client.post('/api/rollback', data=body, content_type='application/json')
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+    assert served_title(client) == 'third'
+
+
+def test_rollback_with_nothing_published_is_404(server):
+    response = server.app.test_client().post('/api/rollback', json={})
+    assert response.status_code == 404
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Syncs that pile up behind a pipeline run share the run that follows it
+Run with: python -m pytest tests
+"""
+
+import threading
+import time
+
+import pytest
+
+from display_week import get_current_week_end
+
+
+@pytest.fixture
+def seeded(server, export_workbook, tmp_path):
+    """A store holding this week's seminars, published once"""
+    path = tmp_path / 'export.xlsx'
+    path.write_bytes(export_workbook([
+        {'Id': number, 'Title': f'Talk {number}', 'Tag(s)': 'Website',
+         'Start date': get_current_week_end(), 'Room location': 'Kuskvillan'}
+        for number in range(5)
+    ]))
+    success, message, _ = server.process_excel_to_csv(path, replace=True)
+    assert success, message
+    return server
+
+
+@pytest.fixture
+def runs(seeded, monkeypatch):
+    """Every run_pipeline call (shared results don't make one)"""
+    calls = []
+    run_pipeline = seeded.run_pipeline
+
+    def counted(*args, **kwargs):
+        calls.append(time.time())
+        return run_pipeline(*args, **kwargs)
+
+    monkeypatch.setattr(seeded, 'run_pipeline', counted)
+    return calls
+
+
+def test_rebuild_requested_before_a_run_shares_its_result(seeded, runs):
+    server = seeded
+    requested = time.time()
+    result = server.process_excel_to_csv()
+    generations = server.list_generations()
+
+    stats = {}
+    assert server.process_excel_to_csv(stats=stats, since=requested) == result
+    assert stats['shared'] is True
+    assert len(runs) == 1
+    assert server.list_generations() == generations
+
+
+def test_rebuild_requested_after_the_last_run_runs_again(seeded, runs):
+    server = seeded
+    server.process_excel_to_csv()
+    stats = {}
+    server.process_excel_to_csv(stats=stats, since=time.time())
+    assert 'shared' not in stats
+    assert len(runs) == 2
+
+
+def test_store_change_since_the_run_is_not_shared(seeded, runs):
+    server = seeded
+    requested = time.time()
+    server.process_excel_to_csv()
+    server.event_store.ingest([('new', 'New talk', '', None, 'Website', 'Kuskvillan',
+                                get_current_week_end().isoformat(), None, None, None)],
+                              server.normalize_rows)
+    stats = {}
+    server.process_excel_to_csv(stats=stats, since=requested)
+    assert 'shared' not in stats
+    assert len(runs) == 2
+
+
+def test_rollback_since_the_run_is_not_shared(seeded, runs):
+    server = seeded
+    requested = time.time()
+    server.process_excel_to_csv()
+    assert server.rollback_snapshot() is not None
+    stats = {}
+    server.process_excel_to_csv(stats=stats, since=requested)
+    assert 'shared' not in stats
+    assert len(runs) == 2
+
+
+def test_syncs_waiting_on_a_run_share_one_pipeline_run(seeded, runs):
+    server = seeded
+    held = threading.Event()
+    release = threading.Event()
+    responses = []
+
+    def running_pipeline():
+        with server.pipeline_lock():
+            held.set()
+            release.wait(10)
+
+    def sync():
+        response = server.app.test_client().post('/api/sync')
+        responses.append((response.status_code, response.get_json()))
+
+    holder = threading.Thread(target=running_pipeline)
+    holder.start()
+    held.wait(5)
+    syncs = [threading.Thread(target=sync) for _ in range(4)]
+    for thread in syncs:
+        thread.start()
+    time.sleep(0.5)  # Let every sync queue up on the lock
+    release.set()
+    holder.join()
+    for thread in syncs:
+        thread.join(30)
+
+    assert len(runs) == 1
+    assert [status for status, _ in responses] == [200] * 4
+    assert sorted(bool(data['stats'].get('shared')) for _, data in responses) == [False, True, True, True]
+    assert len({data['message'] for _, data in responses}) == 1
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Upload -> pipeline stats, end to end through /api/upload and /api/jobs
+Run with: python -m pytest tests
+"""
+
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import openpyxl
+import pytest
+
+# server.py picks its storage directory at import, so point it at a scratch dir first
+os.environ['STORAGE_PATH'] = tempfile.mkdtemp(prefix='smartsign-test-')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import server  # noqa: E402
+from display_week import get_current_week_end  # noqa: E402
+
+server.CSV_PATH = Path(os.environ['STORAGE_PATH']) / 'seminarier.csv'
+
+
+def export_workbook(dates):
+    """ProjectPlace-style export with one website-tagged event per Start date cell"""
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = 'Data'
+    sheet.append(['Id', 'Title', 'Tag(s)', 'Start date', 'Start time', 'Description', 'Room location'])
+    for number, day in enumerate(dates):
+        sheet.append([number, f'Talk {number}', 'Website', day, None,
+                      '<b>Speaker</b><br/>Jane Doe, KTH<br/>', 'Kuskvillan'])
+    body = io.BytesIO()
+    workbook.save(body)
+    return body.getvalue()
+
+
+def wait_for_job(client, status_url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(status_url).get_json()
+        if job['state'] not in ('queued', 'running'):
+            return job
+        time.sleep(0.05)
+    pytest.fail(f'job did not finish within {timeout}s')
+
+
+def test_upload_reports_date_fallback_cells():
+    # Most cells match the inferred ISO format; the rest need per-cell fallback parsing
+    day = get_current_week_end()
+    dates = [day.isoformat()] * 300 + [day.strftime('%B %d, %Y')] * 100
+    client = server.app.test_client()
+
+    response = client.post('/api/upload', data={
+        'file': (io.BytesIO(export_workbook(dates)), 'export.xlsx'),
+        'mode': 'replace',
+    }, content_type='multipart/form-data')
+    assert response.status_code == 202
+
+    job = wait_for_job(client, response.get_json()['status_url'])
+    assert job['state'] == 'succeeded', job['result']
+    assert job['result']['count'] == 400
+    assert job['result']['stats']['date_fallback_cells'] == 100
+    assert '100 date cells needed fallback parsing' in job['result']['message']